@@ -0,0 +1,191 @@
+"""
+Description analysis shared by the API (app.py) and the bulk CLI
+(bulk_analyze.py): extraction, per-item nutrition lookup and totals.
+"""
+
+from pydantic import BaseModel
+from nlp.hybrid_extractor import hybrid_extract
+from usda.cache import normalize_query
+from usda.fooddata_api import get_nutrition_for_item, get_nutrition_for_items, match_ingredient, _normalize_macros_map
+from usda.nutrient_table import MACRO_KEYS, as_dicts, group_totals
+import logging
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class MacroInfo(BaseModel):
+    calories: float
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+
+class FoodItem(BaseModel):
+    ingredient: str
+    quantity: float
+    unit: str
+    macros: MacroInfo
+    usda_match_score: float = None
+    note: str = None
+    # Looked up from the built-in mock data because the USDA API failed
+    degraded: bool = False
+
+class AnalysisResult(BaseModel):
+    input: str
+    items: list[FoodItem]
+    totals: MacroInfo
+
+def _zero_macros():
+    return {"calories": 0.0, "protein_g": 0.0, "carbs_g": 0.0, "fat_g": 0.0}
+
+def format_item_nutrition(item, nutrition_result):
+    """
+    Format nutrition information for a single item.
+    Returns normalized macros dict with calories, protein_g, carbs_g, fat_g
+    """
+    if nutrition_result.get("error"):
+        return _zero_macros()
+
+    # Get macros from the nutrition result
+    macros = nutrition_result.get("macros", {})
+
+    # Ensure all required keys exist and normalize
+    normalized = _normalize_macros_map(macros)
+
+    return normalized
+
+def _item_result(item, nutrition_result):
+    """(FoodItem, macros) for an item and its nutrition lookup; macros is None when it failed"""
+    if nutrition_result.get("error"):
+        metrics.inc("nutrition_lookups_total", outcome="no_match")
+        logger.warning("Nutrition error for %s: %s", item["ingredient"], nutrition_result["error"])
+
+        return FoodItem(
+            ingredient=item.get("ingredient", "unknown"),
+            quantity=item.get("quantity", 1.0),
+            unit=item.get("unit", "serving"),
+            macros=MacroInfo(**_zero_macros()),
+            note=nutrition_result.get("error"),
+            degraded=nutrition_result.get("degraded", False)
+        ), None
+
+    # Format macros
+    macros = format_item_nutrition(item, nutrition_result)
+
+    food_item = FoodItem(
+        ingredient=item.get("ingredient", "unknown"),
+        quantity=item.get("quantity", 1.0),
+        unit=item.get("unit", "serving"),
+        macros=MacroInfo(**macros),
+        usda_match_score=nutrition_result.get("score"),
+        degraded=nutrition_result.get("degraded", False)
+    )
+
+    metrics.inc("nutrition_lookups_total", outcome="ok")
+    logger.debug("Successfully processed %s: %s", item["ingredient"], macros)
+
+    return food_item, macros
+
+def _error_result(item, e):
+    logger.error("Error processing item %s: %s", item, e)
+    metrics.inc("nutrition_lookups_total", outcome="error")
+
+    # Add item with zero macros and error note
+    return FoodItem(
+        ingredient=item.get("ingredient", "unknown"),
+        quantity=item.get("quantity", 1.0),
+        unit=item.get("unit", "serving"),
+        macros=MacroInfo(**_zero_macros()),
+        note=f"Processing error: {str(e)}"
+    ), None
+
+def analyze_item(item):
+    """
+    Look up nutrition for a single extracted item.
+    Returns (FoodItem, macros) where macros is None when the lookup failed
+    """
+    try:
+        logger.debug("Getting nutrition for: %s", item)
+
+        # Get nutrition information
+        with metrics.timed("usda_lookup"):
+            nutrition_result = get_nutrition_for_item(item)
+
+        return _item_result(item, nutrition_result)
+
+    except Exception as e:
+        return _error_result(item, e)
+
+def lookup_key(item):
+    """Items with the same key share one ingredient lookup; quantities are scaled per item"""
+    return normalize_query(item.get("ingredient", ""))
+
+def lookup_match(key):
+    """The match_ingredient result for a lookup_key, for callers that run the lookups themselves"""
+    with metrics.timed("usda_lookup"):
+        return match_ingredient(key)
+
+def analyze_items(items, matches=None, errors=None):
+    """
+    analyze_item for every item, with the lookups made in one
+    get_nutrition_for_items batch. `matches` maps lookup keys to lookup_match
+    results the caller already has (the API makes them concurrently) and
+    `errors` maps lookup keys to the exception their lookup raised
+    """
+    errors = errors or {}
+    pending = [item for item in items if lookup_key(item) not in errors]
+    try:
+        with metrics.timed("usda_lookup_batch"):
+            nutrition_results = iter(get_nutrition_for_items(pending, matches))
+    except Exception as e:
+        logger.error("Batch nutrition lookup failed, retrying per item: %s", e)
+        return [analyze_item(item) for item in items]
+
+    results = []
+    for item in items:
+        error = errors.get(lookup_key(item))
+        if error is not None:
+            results.append(_error_result(item, error))
+            continue
+        try:
+            results.append(_item_result(item, next(nutrition_results)))
+        except Exception as e:
+            results.append(_error_result(item, e))
+    return results
+
+def sum_totals_many(meals):
+    """
+    sum_totals for a list of meals (each a list of (FoodItem, macros) results),
+    summed together with usda.nutrient_table.group_totals
+    """
+    values, groups = [], []
+    for group, results in enumerate(meals):
+        for _, macros in results:
+            # Failed lookups contribute nothing
+            if macros is not None:
+                values.append([macros.get(key, 0.0) for key in MACRO_KEYS])
+                groups.append(group)
+
+    return as_dicts(group_totals(values, groups, len(meals)))
+
+def sum_totals(results):
+    """Sum the macros of (FoodItem, macros) results, rounded to 2 decimal places"""
+    return sum_totals_many([results])[0]
+
+def build_result(text, results):
+    """AnalysisResult for a description from its (FoodItem, macros) lookup results"""
+    return AnalysisResult(
+        input=text,
+        items=[food_item for food_item, _ in results],
+        totals=MacroInfo(**sum_totals(results))
+    )
+
+def analyze_text(text, items=None):
+    """
+    Extract and look up the items of one non-empty description.
+    `items` skips extraction when the caller has already extracted them
+    """
+    if items is None:
+        items = hybrid_extract(text)
+    if not items:
+        logger.info("No food items extracted from: '%s'", text)
+    return build_result(text, analyze_items(items))
@@ -1,36 +1,96 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from nlp.hybrid_extractor import hybrid_extract
-from usda.fooddata_api import get_nutrition_for_item, _normalize_macros_map
+from typing import Optional
+from analysis import (AnalysisResult, FoodItem, MacroInfo, analyze_item, analyze_items, build_result,
+                      lookup_key, lookup_match, sum_totals_many)
+from nlp.hybrid_extractor import extraction_cache_stats, hybrid_extract, hybrid_extract_each
+from nlp.spacy_model import get_model_and_version, warm_up
+from logging_config import configure_logging
+from usda.cache import get_cache
+import metrics
+from response_cache import ResponseCache, etag_matches, make_etag
+from usda.fooddata_api import async_search_flight, nutrient_data_version, search_flight
+from usda.resolution import get_resolution_table
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queue-backed; levels and format from LOG_* environment variables)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Nutri-Vision Text Service", version="1.0.0")
+# Maximum number of USDA lookups in flight for a single request
+MAX_CONCURRENT_LOOKUPS = int(os.getenv("USDA_MAX_CONCURRENT_LOOKUPS", "8"))
+
+# Maximum number of descriptions accepted by /analyze-batch
+MAX_BATCH_DESCRIPTIONS = int(os.getenv("MAX_BATCH_DESCRIPTIONS", "100"))
+
+# Load the spaCy model when a worker starts instead of on its first request
+SPACY_WARMUP = os.getenv("SPACY_WARMUP", "1") != "0"
+
+@asynccontextmanager
+async def lifespan(app):
+    if SPACY_WARMUP:
+        # Runs in each worker after fork; a model preloaded by the parent is reused
+        loaded = await run_in_threadpool(warm_up)
+        logger.info("spaCy warm-up done (model loaded: %s)", loaded)
+    table = get_resolution_table()
+    logger.info("Resolution table: %d ingredients", len(table) if table is not None else 0)
+    yield
+
+app = FastAPI(title="Nutri-Vision Text Service", version="1.0.0", lifespan=lifespan)
+
+# Serialized /analyze-text responses (size and TTL from RESPONSE_CACHE_SIZE / RESPONSE_CACHE_TTL)
+response_cache = ResponseCache()
+
+# Cache stats are read at scrape time, so they cost nothing per request
+metrics.register_collector("extraction_cache", extraction_cache_stats)
+metrics.register_collector("response_cache", lambda: response_cache.stats())
+metrics.register_collector("usda_cache", lambda: get_cache().stats() if get_cache() is not None else {})
+metrics.register_collector("usda_search_flight", search_flight.stats)
+metrics.register_collector("usda_search_flight_async", async_search_flight.stats)
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Request latency histogram and, with SERVER_TIMING=1, a Server-Timing header"""
+    if not metrics.METRICS_ENABLED:
+        return await call_next(request)
+    
+    start = time.perf_counter()
+    if metrics.SERVER_TIMING_ENABLED:
+        with metrics.collect_server_timing() as timings:
+            response = await call_next(request)
+        response.headers["Server-Timing"] = metrics.server_timing_header(
+            timings, total=time.perf_counter() - start
+        )
+    else:
+        response = await call_next(request)
+    
+    # Label by route template (not raw path) to keep the label set bounded
+    route = request.scope.get("route")
+    metrics.observe_request(getattr(route, "path", "unmatched"), time.perf_counter() - start)
+    return response
 
 class TextIn(BaseModel):
     description: str
 
-class MacroInfo(BaseModel):
-    calories: float
-    protein_g: float
-    carbs_g: float
-    fat_g: float
-
-class FoodItem(BaseModel):
-    ingredient: str
-    quantity: float
-    unit: str
-    macros: MacroInfo
-    usda_match_score: float = None
-    note: str = None
-
-class AnalysisResult(BaseModel):
+class BatchTextIn(BaseModel):
+    descriptions: list[str]
+
+class BatchItemResult(BaseModel):
     input: str
     items: list[FoodItem]
     totals: MacroInfo
+    error: Optional[str] = None
+
+class BatchAnalysisResult(BaseModel):
+    results: list[BatchItemResult]
+    unique_lookups: int
 
 @app.get("/")
 def read_root():
@@ -39,39 +99,116 @@ def read_root():
         "version": "1.0.0",
         "endpoints": {
             "analyze": "/analyze-text",
-            "health": "/health"
+            "analyze_batch": "/analyze-batch",
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "extraction_cache": extraction_cache_stats(),
+        "response_cache": response_cache.stats(),
+        "usda_search_flight": search_flight.stats(),
+        "usda_search_flight_async": async_search_flight.stats()
+    }
 
-def _format_item_nutrition(item, nutrition_result):
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics: stage latency histograms, counters and cache stats"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+async def _analyze_items(items, max_concurrency=MAX_CONCURRENT_LOOKUPS):
     """
-    Format nutrition information for a single item.
-    Returns normalized macros dict with calories, protein_g, carbs_g, fat_g
+    Run the nutrition lookups for all items concurrently.
+    At most max_concurrency lookups are in flight at once; results keep the input order
     """
-    if nutrition_result.get("error"):
-        return {
-            "calories": 0.0,
-            "protein_g": 0.0,
-            "carbs_g": 0.0,
-            "fat_g": 0.0
-        }
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
     
-    # Get macros from the nutrition result
-    macros = nutrition_result.get("macros", {})
+    async def analyze_one(item):
+        async with semaphore:
+            # get_nutrition_for_item is blocking (HTTP), so run it in the threadpool
+            return await run_in_threadpool(analyze_item, item)
     
-    # Ensure all required keys exist and normalize
-    normalized = _normalize_macros_map(macros)
+    return await asyncio.gather(*(analyze_one(item) for item in items))
+
+async def _analyze_text(text):
+    """Extract and look up the items of one non-empty description"""
+    logger.debug("Analyzing text: '%s'", text)
+    
+    # Extract food items using hybrid approach
+    items = await run_in_threadpool(hybrid_extract, text)
+    
+    if not items:
+        logger.info("No food items extracted from: '%s'", text)
+        return AnalysisResult(
+            input=text,
+            items=[],
+            totals=MacroInfo(calories=0.0, protein_g=0.0, carbs_g=0.0, fat_g=0.0)
+        )
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Extracted %d items: %s", len(items), [item["ingredient"] for item in items])
+    
+    results = await _analyze_items(items)
+    result = build_result(text, results)
     
-    return normalized
+    logger.debug("Final totals: %s", result.totals)
+    
+    return result
+
+async def _lookup_matches(keys, max_concurrency=MAX_CONCURRENT_LOOKUPS):
+    """
+    Look up every distinct ingredient (lookup key) concurrently, at most
+    max_concurrency at once. Returns ({key: match}, {key: exception})
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def lookup_one(key):
+        async with semaphore:
+            try:
+                return await run_in_threadpool(lookup_match, key), None
+            except Exception as e:
+                return None, e
+    
+    outcomes = await asyncio.gather(*(lookup_one(key) for key in keys))
+    matches, errors = {}, {}
+    for key, (match, error) in zip(keys, outcomes):
+        if error is None:
+            matches[key] = match
+        else:
+            errors[key] = error
+    return matches, errors
+
+def _response_versions():
+    """Model and nutrient-data versions an /analyze-text response depends on"""
+    return get_model_and_version()[1], nutrient_data_version()
+
+def _cacheable(result):
+    """
+    Responses with a failed lookup (an item with a note) or with mock data
+    served during an API outage may differ on retry, so they are not cached
+    """
+    return not any(item.note or item.degraded for item in result.items)
+
+def _etag_response(request, etag, body, cache_status):
+    """The cached body, or 304 Not Modified when the client already has it"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "X-Cache": cache_status}
+    )
 
 @app.post("/analyze-text", response_model=AnalysisResult)
-def analyze_text(payload: TextIn):
+async def analyze_text(payload: TextIn, request: Request):
     """
-    Analyze text input to extract food items and their nutritional information
+    Analyze text input to extract food items and their nutritional information.
+    Responses are cached per (text, model version, nutrient-data version) and
+    carry an ETag; a matching If-None-Match gets 304 Not Modified
     """
     try:
         text = payload.description.strip()
@@ -79,90 +216,91 @@ def analyze_text(payload: TextIn):
         if not text:
             raise HTTPException(status_code=400, detail="Description cannot be empty")
         
-        logger.info(f"Analyzing text: '{text}'")
+        model_version, data_version = await run_in_threadpool(_response_versions)
+        cache_key = ResponseCache.make_key(text, model_version, data_version)
         
-        # Extract food items using hybrid approach
-        items = hybrid_extract(text)
+        cached = response_cache.get(cache_key)
+        metrics.inc("response_cache_lookups_total", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            etag, body = cached
+            return _etag_response(request, etag, body, "HIT")
         
-        if not items:
-            logger.warning(f"No food items extracted from: '{text}'")
-            return AnalysisResult(
-                input=text,
-                items=[],
-                totals=MacroInfo(calories=0.0, protein_g=0.0, carbs_g=0.0, fat_g=0.0)
-            )
+        result = await _analyze_text(text)
+        
+        body = JSONResponse(content=jsonable_encoder(result)).body
+        etag = make_etag(body)
+        if _cacheable(result):
+            response_cache.set(cache_key, etag, body)
+        
+        return _etag_response(request, etag, body, "MISS")
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in analyze_text: %s", e)
+        metrics.inc("http_errors_total", endpoint="analyze_text")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/analyze-batch", response_model=BatchAnalysisResult)
+async def analyze_batch(payload: BatchTextIn):
+    """
+    Analyze many descriptions at once.
+    All descriptions are extracted in one batched NLP pass and identical
+    ingredient lookups are made once for the whole batch. Problems with a
+    single description are reported in its own result instead of failing the batch
+    """
+    if not payload.descriptions:
+        raise HTTPException(status_code=400, detail="Descriptions cannot be empty")
+    if len(payload.descriptions) > MAX_BATCH_DESCRIPTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_DESCRIPTIONS} descriptions per batch"
+        )
+    
+    try:
+        texts = [description.strip() for description in payload.descriptions]
+        non_empty = [i for i, text in enumerate(texts) if text]
         
-        logger.info(f"Extracted {len(items)} items: {[item['ingredient'] for item in items]}")
+        logger.debug("Analyzing batch of %d descriptions", len(texts))
         
-        items_out = []
-        totals = {"calories": 0.0, "protein_g": 0.0, "carbs_g": 0.0, "fat_g": 0.0}
+        extracted = [([], "Description cannot be empty") for _ in texts]
+        batch_results = await run_in_threadpool(hybrid_extract_each, [texts[i] for i in non_empty])
+        for i, result in zip(non_empty, batch_results):
+            extracted[i] = result
         
-        for item in items:
-            try:
-                logger.info(f"Getting nutrition for: {item}")
-                
-                # Get nutrition information
-                nutrition_result = get_nutrition_for_item(item)
-                
-                if nutrition_result.get("error"):
-                    logger.warning(f"Nutrition error for {item['ingredient']}: {nutrition_result['error']}")
-                    macros = {"calories": 0.0, "protein_g": 0.0, "carbs_g": 0.0, "fat_g": 0.0}
-                    
-                    items_out.append(FoodItem(
-                        ingredient=item.get("ingredient", "unknown"),
-                        quantity=item.get("quantity", 1.0),
-                        unit=item.get("unit", "serving"),
-                        macros=MacroInfo(**macros),
-                        note=nutrition_result.get("error")
-                    ))
-                    continue
-                
-                # Format macros
-                macros = _format_item_nutrition(item, nutrition_result)
-                
-                # Accumulate totals
-                for key in totals:
-                    totals[key] += macros.get(key, 0.0)
-                
-                # Add to output
-                items_out.append(FoodItem(
-                    ingredient=item.get("ingredient", "unknown"),
-                    quantity=item.get("quantity", 1.0),
-                    unit=item.get("unit", "serving"),
-                    macros=MacroInfo(**macros),
-                    usda_match_score=nutrition_result.get("score")
-                ))
-                
-                logger.info(f"Successfully processed {item['ingredient']}: {macros}")
-                
-            except Exception as e:
-                logger.error(f"Error processing item {item}: {str(e)}")
-                
-                # Add item with zero macros and error note
-                macros = {"calories": 0.0, "protein_g": 0.0, "carbs_g": 0.0, "fat_g": 0.0}
-                items_out.append(FoodItem(
-                    ingredient=item.get("ingredient", "unknown"),
-                    quantity=item.get("quantity", 1.0),
-                    unit=item.get("unit", "serving"),
-                    macros=MacroInfo(**macros),
-                    note=f"Processing error: {str(e)}"
-                ))
+        # One lookup per distinct ingredient across the batch; every item is
+        # then scaled to its own quantity in a single pass
+        unique_keys = dict.fromkeys(lookup_key(item) for items, _ in extracted for item in items)
+        # Items without an ingredient fail in analyze_items without a lookup
+        unique_keys.pop("", None)
+        keys = list(unique_keys)
+        matches, errors = await _lookup_matches(keys)
         
-        # Round totals to 2 decimal places
-        totals = {k: round(v, 2) for k, v in totals.items()}
+        logger.debug("Batch needed %d unique lookups", len(keys))
         
-        logger.info(f"Final totals: {totals}")
+        all_items = [item for items, _ in extracted for item in items]
+        all_results = await run_in_threadpool(analyze_items, all_items, matches, errors)
         
-        return AnalysisResult(
-            input=text,
-            items=items_out,
-            totals=MacroInfo(**totals)
-        )
+        meals, start = [], 0
+        for items, _ in extracted:
+            meals.append(all_results[start:start + len(items)])
+            start += len(items)
+        totals = sum_totals_many(meals)
+        
+        results_out = []
+        for text, (_, error), results, meal_totals in zip(texts, extracted, meals, totals):
+            results_out.append(BatchItemResult(
+                input=text,
+                items=[food_item for food_item, _ in results],
+                totals=MacroInfo(**meal_totals),
+                error=error
+            ))
+        
+        return BatchAnalysisResult(results=results_out, unique_lookups=len(keys))
     
-    except HTTPException:
-        raise
     except Exception as e:
-        logger.error(f"Unexpected error in analyze_text: {str(e)}")
+        logger.exception("Unexpected error in analyze_batch: %s", e)
+        metrics.inc("http_errors_total", endpoint="analyze_batch")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.post("/test-extraction")
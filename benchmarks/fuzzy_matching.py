@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Fuzzy-matching microbenchmark: difflib loop vs nlp.fuzzy batch scoring.
+
+Scores one query against N food names at the merge_extractions threshold
+(0.7), checks both paths return the same scores, and reports the time per
+query for the difflib loop, nlp.fuzzy with rapidfuzz, and nlp.fuzzy's
+pure-difflib fallback. Run from the repository root:
+    python benchmarks/fuzzy_matching.py [--choices 10 100 1000] [--repeat 5]
+"""
+
+import argparse
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nlp import fuzzy
+from nlp.lexicon import FOOD_LEXICON_PATH, read_terms
+
+THRESHOLD = 0.7
+
+def difflib_scores(query, choices, threshold):
+    scores = []
+    for choice in choices:
+        score = SequenceMatcher(None, query, choice).ratio()
+        scores.append(score if score > threshold else 0.0)
+    return scores
+
+def time_queries(fn, queries, choices, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query, choices, THRESHOLD)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--choices", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    terms = read_terms(FOOD_LEXICON_PATH)
+    rapidfuzz_available = fuzzy.HAVE_RAPIDFUZZ
+
+    print(f"{'choices':>8} {'difflib (us)':>13} {'rapidfuzz (us)':>15} {'fallback (us)':>14} {'speedup':>8}")
+    for n in args.choices:
+        # Food names plus some misspelled variants so a few pass the threshold
+        choices = [random.choice(terms) + random.choice(["", "s", " salad", " juice"]) for _ in range(n)]
+        queries = [random.choice(terms) for _ in range(args.queries)]
+
+        for query in queries:
+            if fuzzy.scores_above(query, choices, THRESHOLD) != difflib_scores(query, choices, THRESHOLD):
+                raise SystemExit(f"Score mismatch for {query!r}")
+
+        difflib_time = time_queries(difflib_scores, queries, choices, args.repeat)
+        fuzzy.HAVE_RAPIDFUZZ = False
+        fallback_time = time_queries(fuzzy.scores_above, queries, choices, args.repeat)
+        fuzzy.HAVE_RAPIDFUZZ = rapidfuzz_available
+        if rapidfuzz_available:
+            rapidfuzz_time = time_queries(fuzzy.scores_above, queries, choices, args.repeat)
+            rapidfuzz_column = f"{rapidfuzz_time * 1e6:>15.1f}"
+            speedup = difflib_time / rapidfuzz_time
+        else:
+            rapidfuzz_column = f"{'n/a':>15}"
+            speedup = difflib_time / fallback_time
+        print(f"{n:>8} {difflib_time * 1e6:>13.1f} {rapidfuzz_column} {fallback_time * 1e6:>14.1f} {speedup:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
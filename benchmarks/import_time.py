@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark: wall time of importing modules in a fresh interpreter.
+
+Each module is imported REPEAT times in a new `python -c` process; the
+median is reported along with whether the import pulled in spaCy.
+Run from the repository root:
+    python benchmarks/import_time.py [--modules app nlp.hybrid_extractor] [--repeat 5]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = ["app", "nlp.hybrid_extractor", "nlp.preprocessing", "usda.fooddata_api"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "spacy": "spacy" in sys.modules}}))
+"""
+
+def time_import(module):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':<24} {'median (s)':>11} {'min (s)':>9} {'imports spacy':>14}")
+    for module in args.modules:
+        runs = [time_import(module) for _ in range(args.repeat)]
+        seconds = [run["seconds"] for run in runs]
+        print(f"{module:<24} {statistics.median(seconds):>11.3f} {min(seconds):>9.3f} "
+              f"{str(runs[0]['spacy']):>14}")
+
+if __name__ == "__main__":
+    main()
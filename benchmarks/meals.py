@@ -0,0 +1,56 @@
+"""
+Synthetic meal descriptions for benchmarks and load tests.
+
+Descriptions mix the forms users actually type: digits, decimals,
+fractions and number words, every unit spelling in UNIT_ALIASES, foods
+from the lexicon, "with"/"and"/comma separators and chatty lead-ins.
+`complexity` is the number of food items per description.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nlp.lexicon import FOOD_LEXICON_PATH, read_terms
+from nlp.rules import UNIT_ALIASES
+
+QUANTITIES = ["1", "2", "3", "4", "100", "150", "200", "250", "0.5", "1.5", "1/2", "1/4",
+              "one", "two", "three", "half", "a", "an"]
+LEAD_INS = ["", "", "I had ", "I ate ", "For breakfast I had ", "Lunch was ", "Dinner: ",
+            "Just finished ", "Snack - "]
+SEPARATORS = [" and ", " with ", ", ", " and ", " plus "]
+TRAILERS = ["", "", "", " for lunch", " this morning", " after the gym", "."]
+
+def _item(rng, foods, units):
+    food = rng.choice(foods)
+    form = rng.random()
+    if form < 0.45:
+        return f"{rng.choice(QUANTITIES)} {rng.choice(units)} of {food}"
+    if form < 0.65:
+        return f"{rng.choice(QUANTITIES)} {rng.choice(units)} {food}"
+    if form < 0.8:
+        return f"{rng.choice(QUANTITIES)} {food}"
+    if form < 0.9:
+        return f"{food} {rng.choice(['100', '200', '250'])}g"
+    return food
+
+def generate_meal(rng, complexity, foods, units):
+    """One description with `complexity` food items"""
+    items = [_item(rng, foods, units) for _ in range(complexity)]
+    text = items[0]
+    for item in items[1:]:
+        text += rng.choice(SEPARATORS) + item
+    return rng.choice(LEAD_INS) + text + rng.choice(TRAILERS)
+
+def generate_meals(count, seed=0, min_items=1, max_items=6):
+    """`count` reproducible descriptions (same seed, same list) of 1..max_items items"""
+    rng = random.Random(seed)
+    foods = read_terms(FOOD_LEXICON_PATH)
+    units = sorted(UNIT_ALIASES)
+    return [generate_meal(rng, rng.randint(min_items, max_items), foods, units) for _ in range(count)]
+
+if __name__ == "__main__":
+    for meal in generate_meals(int(sys.argv[1]) if len(sys.argv) > 1 else 10):
+        print(meal)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Pathological-input benchmark: regex rules vs the single-pass rule engine.
+
+Inputs are long clauses that never satisfy the patterns' lookaheads, which
+makes the PATTERNS regexes retry from every start position (quadratic time).
+Run from the repository root:
+    python benchmarks/rule_engine_pathological.py [--sizes 100 200 400 800]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nlp import rule_engine, rules
+
+# name -> builder(n) producing a clause of n repeated units
+CASES = {
+    "words_then_digit": lambda n: "rice " * n + "1x",
+    "qty_word_chain": lambda n: "a cup " * n + "2x",
+}
+
+def time_call(fn, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'case':<22} {'n':>6} {'chars':>7} {'regex (s)':>10} {'engine (s)':>11} {'speedup':>8}")
+    for name, build in CASES.items():
+        for n in args.sizes:
+            text = build(n)
+            if rules.parse_clause(text) != rule_engine.parse_clause(text):
+                raise SystemExit(f"Output mismatch for {name} n={n}")
+            regex_time = time_call(rules.parse_clause, text, args.repeat)
+            engine_time = time_call(rule_engine.parse_clause, text, args.repeat)
+            print(f"{name:<22} {n:>6} {len(text):>7} {regex_time:>10.4f} {engine_time:>11.4f} "
+                  f"{regex_time / engine_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
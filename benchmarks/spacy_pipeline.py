@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+spaCy pipeline benchmark: full pipeline vs NER-only serving mode.
+
+Loads the model in both modes and reports the per-document time of each
+pipeline step, the total, and whether both modes find the same entities.
+Run from the repository root:
+    python benchmarks/spacy_pipeline.py [--model models/food_ner] [--repeat 5]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nlp.spacy_model import MODEL_PATH, component_timings, load_trained_model
+
+SAMPLES_PATH = Path(__file__).resolve().parent.parent / "data" / "food_samples.json"
+
+def load_texts():
+    with open(SAMPLES_PATH, "r") as f:
+        return [text for text, _ in json.load(f)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = load_texts() * args.repeat
+    ents = {}
+    for mode in ("full", "ner"):
+        nlp = load_trained_model(args.model, mode=mode)
+        if nlp is None:
+            raise SystemExit(f"Could not load a model from {args.model}")
+        ents[mode] = [[(e.start_char, e.end_char, e.label_) for e in doc.ents] for doc in nlp.pipe(texts)]
+
+        timings = component_timings(nlp, texts)
+        print(f"{mode} mode: pipeline {nlp.pipe_names}")
+        for name, ms in timings.items():
+            print(f"  {name:<20} {ms:>8.3f} ms/doc")
+        print(f"  {'total':<20} {sum(timings.values()):>8.3f} ms/doc")
+
+    print(f"Same entities in both modes: {ents['full'] == ents['ner']}")
+
+if __name__ == "__main__":
+    main()
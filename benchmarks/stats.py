@@ -0,0 +1,10 @@
+"""Summary statistics shared by the benchmark suite and the load generator."""
+
+import math
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0.0 when it is empty)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
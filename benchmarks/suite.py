@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: extraction and nutrition lookup throughput and latency.
+
+Runs rule_based_extraction, hybrid_extract (memo disabled) and
+get_nutrition_for_item over synthetic meal descriptions (benchmarks/meals.py)
+and reports ops/sec and p50/p95/p99 latency. Runs offline: the USDA API key
+is cleared so lookups use the built-in mock data (or the local index when
+one is built), and the on-disk USDA cache is disabled.
+
+Results are written as JSON per commit so runs can be compared:
+    python benchmarks/suite.py run [--count 500] [--seed 0] [--repeat 3] [-o benchmarks/results/<commit>.json]
+    python benchmarks/suite.py compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Offline and uncached; must be set before the service modules are imported
+os.environ["USDA_API_KEY"] = ""
+os.environ["USDA_CACHE_PATH"] = ""
+os.environ["EXTRACTION_CACHE_SIZE"] = "0"
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.meals import generate_meals
+from benchmarks.stats import percentile
+
+def measure(fn, inputs, repeat=3, warmup=20):
+    """
+    Call fn on every input (after a warm-up), `repeat` times, and summarize
+    per-call latency of the fastest round (the least disturbed by noise)
+    """
+    for value in inputs[:warmup]:
+        fn(value)
+    best = None
+    for _ in range(repeat):
+        latencies = []
+        start = time.perf_counter()
+        for value in inputs:
+            call_start = time.perf_counter()
+            fn(value)
+            latencies.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, latencies)
+    elapsed, latencies = best
+    latencies.sort()
+    return {
+        "ops": len(inputs),
+        "ops_per_sec": round(len(inputs) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+    }
+
+def git_commit():
+    """Short HEAD commit, with a -dirty suffix when the tree has changes"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_suite(count, seed, repeat):
+    from nlp.hybrid_extractor import hybrid_extract
+    from nlp.rule_engine import rule_based_extraction
+    from nlp.spacy_model import get_model
+    from usda.fooddata_api import get_nutrition_for_item
+
+    meals = generate_meals(count, seed=seed)
+    has_model = get_model() is not None
+
+    # Lookups run on the items the extractor produces, as in /analyze-text
+    items = [item for meal in meals for item in rule_based_extraction(meal)]
+
+    return {
+        "rule_based_extraction": measure(rule_based_extraction, meals, repeat),
+        "hybrid_extract": dict(measure(hybrid_extract, meals, repeat), spacy_model=has_model),
+        "get_nutrition_for_item": measure(get_nutrition_for_item, items, repeat),
+    }
+
+def run(args):
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"count": args.count, "seed": args.seed, "repeat": args.repeat},
+        "benchmarks": run_suite(args.count, args.seed, args.repeat),
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"commit {commit}, {args.count} meals, seed {args.seed}")
+    print(f"{'benchmark':<24} {'ops/sec':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in results["benchmarks"].items():
+        print(f"{name:<24} {stats['ops_per_sec']:>10.1f} {stats['p50_ms']:>9.3f} "
+              f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    print(f"Results written to {output}")
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    if baseline.get("params") != candidate.get("params"):
+        print(f"warning: different params {baseline.get('params')} vs {candidate.get('params')}")
+
+    regressions = []
+    print(f"{'benchmark':<24} {'metric':<12} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for name, old in baseline["benchmarks"].items():
+        new = candidate["benchmarks"].get(name)
+        if new is None:
+            continue
+        for metric in ("ops_per_sec", "p50_ms", "p95_ms", "p99_ms"):
+            if not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100
+            # Fewer ops/sec or more latency is worse
+            worse = -change if metric == "ops_per_sec" else change
+            flag = " !" if worse > args.threshold else ""
+            if flag:
+                regressions.append(f"{name} {metric}")
+            print(f"{name:<24} {metric:<12} {old[metric]:>10.3f} {new[metric]:>10.3f} {change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"Regressions over {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and write a results file")
+    run_parser.add_argument("--count", type=int, default=500, help="Number of synthetic meals")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3, help="Rounds per benchmark; the fastest is kept")
+    run_parser.add_argument("-o", "--output", help="Results file (default benchmarks/results/<commit>.json)")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Percent change counted as a regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+if __name__ == "__main__":
+    main()
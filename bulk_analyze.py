@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Bulk analysis of meal-log archives.
+
+Reads descriptions from a JSONL file (one object per line, the description in
+--field; bare JSON strings work too) or a plain text file (one description per
+line), analyzes them in a bounded pool of worker threads and writes one JSON
+result per input line to the output, in input order, as soon as it is ready.
+At most --workers * 4 descriptions are in flight, so memory stays flat
+whatever the size of the input. Extraction is CPU-bound; --processes moves it
+to a pool of worker processes (nlp/parallel.py) so it scales with cores,
+while the nutrition lookups stay in the threads.
+
+Progress is checkpointed to <output>.checkpoint every --checkpoint-every
+results; after an interruption, --resume continues after the last checkpoint:
+    python bulk_analyze.py meals.jsonl -o results.jsonl [--workers 8] [--resume]
+
+Each output line has the shape of an /analyze-batch result plus the input
+line number (and --id-field, when the input records have it).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+from analysis import analyze_text
+from logging_config import configure_logging
+
+WINDOW_PER_WORKER = 4
+
+def detect_format(path):
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json") else "text"
+
+def read_records(f, input_format, field="description", id_field="id", line=0):
+    """
+    Yield (line number, input offset after the line, record) for every
+    non-blank line of a binary file. A record has "input" and, for JSONL,
+    "id"; unreadable lines get an "error" instead of being skipped
+    """
+    offset = f.tell()
+    for raw in f:
+        line += 1
+        offset += len(raw)
+        text = raw.decode("utf-8", errors="replace").strip()
+        if not text:
+            continue
+
+        if input_format == "text":
+            yield line, offset, {"input": text}
+            continue
+
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            yield line, offset, {"input": "", "error": f"Invalid JSON: {e}"}
+            continue
+        if isinstance(data, str):
+            yield line, offset, {"input": data.strip()}
+        elif isinstance(data, dict) and isinstance(data.get(field), str):
+            record = {"input": data[field].strip()}
+            if id_field in data:
+                record["id"] = data[id_field]
+            yield line, offset, record
+        else:
+            yield line, offset, {"input": "", "error": f"No '{field}' string in record"}
+
+def process_record(line, record, extracted=None):
+    """
+    Output object for one input record.
+    `extracted` is (items, error) when extraction already ran elsewhere
+    (the --processes pool); otherwise it runs here
+    """
+    output = {"line": line}
+    if "id" in record:
+        output["id"] = record["id"]
+
+    error = record.get("error")
+    if error is None and not record["input"]:
+        error = "Description cannot be empty"
+    items = None
+    if error is None and extracted is not None:
+        items, error = extracted
+    if error is None:
+        try:
+            result = jsonable_encoder(analyze_text(record["input"], items))
+            output.update(result, error=None)
+            return output
+        except Exception as e:
+            error = f"Analysis error: {str(e)}"
+
+    output.update(
+        input=record["input"],
+        items=[],
+        totals={"calories": 0.0, "protein_g": 0.0, "carbs_g": 0.0, "fat_g": 0.0},
+        error=error
+    )
+    return output
+
+def _extraction_pool(processes):
+    """ParallelExtractor with `processes` workers, or a no-op context when 0"""
+    if not processes:
+        return nullcontext()
+    from nlp.parallel import ParallelExtractor
+    return ParallelExtractor(processes=processes)
+
+def _with_extraction(records, extractor):
+    """
+    (line, offset, record, extracted) for every record; `extracted` comes from
+    the process pool when there is one and is None otherwise
+    """
+    if extractor is None:
+        for line, offset, record in records:
+            yield line, offset, record, None
+        return
+
+    # imap reads texts lazily and yields in order, so the records it has
+    # consumed but not yet answered wait in a queue of bounded length
+    waiting = deque()
+
+    def texts():
+        for line, offset, record in records:
+            waiting.append((line, offset, record))
+            yield "" if record.get("error") else record["input"]
+
+    for extracted in extractor.imap(texts()):
+        line, offset, record = waiting.popleft()
+        yield line, offset, record, extracted
+
+def load_checkpoint(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+class Progress:
+    """Running totals, printed to stderr at most every `interval` seconds"""
+
+    def __init__(self, interval, done=0):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.resumed = done
+        self.done = done
+        self.items = 0
+        self.errors = 0
+
+    def add(self, output):
+        self.done += 1
+        self.items += len(output["items"])
+        if output["error"]:
+            self.errors += 1
+        now = time.perf_counter()
+        if self.interval and now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+    def report(self, now=None, final=False):
+        elapsed = (now or time.perf_counter()) - self.start
+        processed = self.done - self.resumed
+        rate = processed / elapsed if elapsed else 0.0
+        prefix = "Done:" if final else "Progress:"
+        print(f"{prefix} {self.done} descriptions ({processed} this run) in {elapsed:.1f}s, "
+              f"{rate:.1f} descriptions/sec, {self.items / elapsed if elapsed else 0.0:.1f} items/sec, "
+              f"{self.errors} errors", file=sys.stderr, flush=True)
+
+def run(args):
+    input_path = Path(args.input)
+    output_path = Path(args.output)
+    checkpoint_path = Path(f"{output_path}.checkpoint")
+    input_format = detect_format(input_path) if args.format == "auto" else args.format
+
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    if checkpoint is not None and checkpoint.get("input") != str(input_path.resolve()):
+        sys.exit(f"{checkpoint_path} belongs to {checkpoint.get('input')}, not {input_path}")
+    if checkpoint is None:
+        checkpoint = {"input": str(input_path.resolve()), "input_offset": 0, "output_offset": 0,
+                      "line": 0, "done": 0}
+    elif not output_path.exists() or output_path.stat().st_size < checkpoint["output_offset"]:
+        sys.exit(f"{output_path} is missing or shorter than its checkpoint; cannot resume")
+    else:
+        print(f"Resuming after line {checkpoint['line']} ({checkpoint['done']} results)", file=sys.stderr)
+
+    progress = Progress(args.progress_every, checkpoint["done"])
+    window = max(1, args.workers) * WINDOW_PER_WORKER
+    since_checkpoint = 0
+
+    with open(input_path, "rb") as f_in, open(output_path, "a+b" if checkpoint["done"] else "wb") as f_out:
+        # Drop anything written after the last checkpoint
+        f_out.truncate(checkpoint["output_offset"])
+        f_out.seek(checkpoint["output_offset"])
+        f_in.seek(checkpoint["input_offset"])
+
+        def write_next(pending):
+            nonlocal since_checkpoint
+            line, offset, future = pending.popleft()
+            output = future.result()
+            f_out.write(json.dumps(output, ensure_ascii=False).encode("utf-8") + b"\n")
+            progress.add(output)
+
+            since_checkpoint += 1
+            if since_checkpoint >= args.checkpoint_every:
+                since_checkpoint = 0
+                save(line, offset)
+
+        def save(line, offset):
+            f_out.flush()
+            os.fsync(f_out.fileno())
+            checkpoint.update(input_offset=offset, output_offset=f_out.tell(), line=line, done=progress.done)
+            write_checkpoint(checkpoint_path, checkpoint)
+
+        records = read_records(f_in, input_format, args.field, args.id_field, checkpoint["line"])
+        last = (checkpoint["line"], checkpoint["input_offset"])
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor, \
+                _extraction_pool(args.processes) as extractor:
+            pending = deque()
+            for line, offset, record, extracted in _with_extraction(records, extractor):
+                pending.append((line, offset, executor.submit(process_record, line, record, extracted)))
+                last = (line, offset)
+                if len(pending) >= window:
+                    write_next(pending)
+            while pending:
+                write_next(pending)
+
+        save(*last)
+
+    progress.report(final=True)
+    if not args.keep_checkpoint:
+        checkpoint_path.unlink()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or text file of descriptions")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to write results to")
+    parser.add_argument("--format", choices=("auto", "jsonl", "text"), default="auto",
+                        help="Input format (auto: JSONL for .jsonl/.ndjson/.json, otherwise text)")
+    parser.add_argument("--field", default="description", help="JSONL field holding the description")
+    parser.add_argument("--id-field", default="id", help="JSONL field copied to the output when present")
+    parser.add_argument("--workers", type=int, default=8, help="Descriptions analyzed concurrently")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Run extraction in this many worker processes (0: in the worker threads)")
+    parser.add_argument("--resume", action="store_true", help="Continue from <output>.checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Results between checkpoints")
+    parser.add_argument("--keep-checkpoint", action="store_true", help="Keep the checkpoint after finishing")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    configure_logging()
+    run(args)
+
+if __name__ == "__main__":
+    main()
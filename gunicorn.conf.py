@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for serving app:app with pre-forked uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app and the spaCy model are loaded once in the master process and the
+workers are forked from it, so the model's memory is shared copy-on-write
+instead of being loaded again by every worker.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import app:app in the master before forking
+preload_app = True
+
+def on_starting(server):
+    # Runs in the master after the app is preloaded and before any worker is forked
+    from nlp.spacy_model import warm_up
+    loaded = warm_up()
+    server.log.info("Food lexicon and spaCy model preloaded in master (model loaded: %s)", loaded)
+
+    # Move everything allocated so far into the permanent generation so the
+    # workers' garbage collections do not write to (and so copy) those pages
+    gc.collect()
+    gc.freeze()
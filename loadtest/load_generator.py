@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Load generator for /analyze-text.
+
+For each concurrency level, N worker threads send POST /analyze-text over
+keep-alive connections for a fixed duration. Reports throughput, latency
+percentiles, HTTP errors and, when the service is pointed at
+loadtest/stub_server.py, the upstream calls the level caused.
+
+    python loadtest/load_generator.py --url http://127.0.0.1:8000 \\
+        --stub http://127.0.0.1:8089 --concurrency 1 4 16 --duration 20
+
+Descriptions are synthetic meals (benchmarks/meals.py); --distinct sets how
+many different ones are sent, so cache effects can be measured.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.meals import generate_meals
+from benchmarks.stats import percentile
+
+def stub_stats(stub_url, reset=False):
+    """Call counts from the stub's /_stats endpoint ({} when there is no stub)"""
+    if not stub_url:
+        return {}
+    try:
+        with urlopen(f"{stub_url.rstrip('/')}/_stats{'?reset=1' if reset else ''}", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return {}
+
+def worker(url, meals, deadline, seed, results, lock):
+    target = urlparse(url)
+    conn_class = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+    conn = conn_class(target.hostname, target.port, timeout=60)
+    rng = random.Random(seed)
+    latencies, errors, statuses = [], 0, {}
+
+    while time.monotonic() < deadline:
+        body = json.dumps({"description": rng.choice(meals)})
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/analyze-text", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = conn_class(target.hostname, target.port, timeout=60)
+            status = "connection_error"
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status != 200:
+            errors += 1
+
+    conn.close()
+    with lock:
+        results["latencies"].extend(latencies)
+        results["errors"] += errors
+        for status, count in statuses.items():
+            results["statuses"][status] = results["statuses"].get(status, 0) + count
+
+def run_level(url, meals, concurrency, duration, stub_url):
+    stub_stats(stub_url, reset=True)
+    results = {"latencies": [], "errors": 0, "statuses": {}}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    threads = [
+        threading.Thread(target=worker, args=(url, meals, deadline, seed, results, lock))
+        for seed in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results["latencies"])
+    upstream = stub_stats(stub_url)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": results["errors"],
+        "statuses": {str(k): v for k, v in results["statuses"].items()},
+        "upstream": upstream,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Service base URL")
+    parser.add_argument("--stub", default="", help="Stub server base URL, for upstream call counts")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--distinct", type=int, default=200, help="Number of distinct descriptions sent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    meals = generate_meals(args.distinct, seed=args.seed)
+    levels = []
+
+    print(f"{'conc':>5} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'upstream calls':>15}")
+    for concurrency in args.concurrency:
+        level = run_level(args.url, meals, concurrency, args.duration, args.stub)
+        levels.append(level)
+        upstream_calls = sum(v for k, v in level["upstream"].items() if k.endswith("_requests"))
+        print(f"{concurrency:>5} {level['requests']:>9} {level['rps']:>8.1f} {level['p50_ms']:>8.2f} "
+              f"{level['p95_ms']:>8.2f} {level['p99_ms']:>8.2f} {level['errors']:>7} "
+              f"{upstream_calls if args.stub else '-':>15}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": args.url, "distinct": args.distinct, "duration": args.duration,
+                       "levels": levels}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
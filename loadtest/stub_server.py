@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Local stub of the FoodData Central API for load tests.
+
+Serves the endpoints the service calls with deterministic data:
+    GET  /foods/search?query=...&pageSize=N
+    GET  /food/{fdcId}
+    POST /foods          {"fdcIds": [...]}
+plus GET /_stats (per-endpoint call counts; ?reset=1 clears them).
+
+Foods come from the lexicon; any other query gets a synthetic food, so
+every lookup finds something. Latency, error rate and a rate limit are
+configurable. Point the service at it with:
+    python loadtest/stub_server.py --port 8089 --latency 80 --error-rate 0.01
+    USDA_BASE_URL=http://127.0.0.1:8089 USDA_API_KEY=stub uvicorn app:app
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nlp.lexicon import FOOD_LEXICON_PATH, read_terms
+
+NUTRIENTS = (
+    (1008, "Energy", "kcal", 20.0, 600.0),
+    (1003, "Protein", "g", 0.0, 35.0),
+    (1005, "Carbohydrate, by difference", "g", 0.0, 80.0),
+    (1004, "Total lipid (fat)", "g", 0.0, 40.0),
+)
+
+def _fdc_id(name):
+    return 100000 + int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:8], 16) % 900000
+
+def make_food(name):
+    """Deterministic food (search-result shape) for a name"""
+    rng = random.Random(name)
+    return {
+        "fdcId": _fdc_id(name),
+        "description": f"{name.capitalize()}, raw",
+        "foodNutrients": [
+            {"nutrientId": nid, "nutrientName": label, "value": round(rng.uniform(low, high), 2), "unitName": unit}
+            for nid, label, unit, low, high in NUTRIENTS
+        ],
+    }
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts up to `rate`"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class StubState:
+    def __init__(self, latency_ms, jitter_ms, error_rate, rate_limit):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+        # Lexicon foods, read-only after start-up, in search-result order
+        self.foods = {}
+        for term in read_terms(FOOD_LEXICON_PATH):
+            food = make_food(term)
+            self.foods[food["fdcId"]] = food
+        self.ranked = sorted(
+            ((food["description"].lower(), food) for food in self.foods.values()),
+            key=lambda entry: (len(entry[0]), entry[1]["fdcId"])
+        )
+        # Synthetic foods made for unmatched queries, by query and by fdcId
+        self.synthetic = {}
+        self.synthetic_ids = {}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def get(self, fdc_id):
+        food = self.foods.get(fdc_id)
+        if food is None:
+            with self.lock:
+                food = self.synthetic_ids.get(fdc_id)
+        return food
+
+    def search(self, query, limit):
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        matches = []
+        for description, food in self.ranked:
+            if query in description:
+                matches.append(food)
+                if len(matches) >= limit:
+                    break
+        if matches:
+            return matches
+        with self.lock:
+            food = self.synthetic.get(query)
+            if food is None:
+                food = self.synthetic[query] = make_food(query)
+                self.synthetic_ids.setdefault(food["fdcId"], food)
+        return [food][:limit]
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "FDCStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _upstream_behaviour(self, endpoint):
+        """Apply rate limit, latency and injected errors; True when the request may proceed"""
+        state = self.state
+        state.count(f"{endpoint}_requests")
+        if state.bucket is not None and not state.bucket.allow():
+            state.count("rate_limited")
+            self._send(429, {"error": "rate limited"}, {"Retry-After": "1"})
+            return False
+        if state.latency or state.jitter:
+            time.sleep(max(0.0, state.latency + random.uniform(-state.jitter, state.jitter)))
+        if state.error_rate and random.random() < state.error_rate:
+            state.count("errors_injected")
+            self._send(random.choice((500, 503)), {"error": "injected failure"})
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == "/_stats":
+            with self.state.lock:
+                stats = dict(self.state.stats)
+                if params.get("reset", ["0"])[0] == "1":
+                    self.state.stats.clear()
+            self._send(200, stats)
+        elif url.path.rstrip("/").endswith("/foods/search"):
+            if self._upstream_behaviour("search"):
+                limit = int(params.get("pageSize", ["5"])[0])
+                foods = self.state.search(params.get("query", [""])[0], limit)
+                self._send(200, {"totalHits": len(foods), "foods": foods})
+        elif "/food/" in url.path:
+            if self._upstream_behaviour("food"):
+                try:
+                    food = self.state.get(int(url.path.rstrip("/").rsplit("/", 1)[1]))
+                except ValueError:
+                    food = None
+                if food is None:
+                    self._send(404, {"error": "not found"})
+                else:
+                    self._send(200, food)
+        else:
+            self._send(404, {"error": "unknown endpoint"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = None
+
+        if url.path.rstrip("/").endswith("/foods"):
+            try:
+                ids = payload.get("fdcIds", [])
+                if not isinstance(ids, list):
+                    raise TypeError
+                ids = [int(i) for i in ids]
+            except (AttributeError, TypeError, ValueError):
+                self._send(400, {"error": "expected {\"fdcIds\": [integer, ...]}"})
+                return
+            if self._upstream_behaviour("foods"):
+                self.state.count("foods_ids", len(ids))
+                foods = (self.state.get(i) for i in ids)
+                self._send(200, [food for food in foods if food is not None])
+        else:
+            self._send(404, {"error": "unknown endpoint"})
+
+def make_server(host="127.0.0.1", port=8089, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit=0.0):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(latency_ms, jitter_ms, error_rate, rate_limit)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=50.0, help="Mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=10.0, help="Uniform latency jitter in ms (+/-)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 500/503")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before 429 (0 = unlimited)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.jitter, args.error_rate, args.rate_limit)
+    print(f"FDC stub on http://{args.host}:{args.port} (latency {args.latency}±{args.jitter} ms, "
+          f"error rate {args.error_rate}, rate limit {args.rate_limit or 'none'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
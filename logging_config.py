@@ -0,0 +1,134 @@
+"""
+Logging setup for the service.
+
+Records are put on an in-memory queue by a QueueHandler and written to
+stderr by a QueueListener thread, so logging calls never block on I/O;
+queue_handler() gives other outputs (e.g. the USDA query log) the same.
+Configured through environment variables:
+
+    LOG_LEVEL               root level (default INFO)
+    LOG_LEVELS              per-module levels, e.g. "nlp=DEBUG,usda.cache=WARNING"
+    LOG_FORMAT              "text" (default) or "json" (one JSON object per line)
+    LOG_DEBUG_SAMPLE_RATE   fraction of DEBUG records kept (default 1.0)
+
+Use lazy %-style arguments (logger.debug("items: %s", items)) so messages
+are only formatted when a record is actually emitted.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra` fields are included as keys"""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+class DebugSampler(logging.Filter):
+    """Keeps every record above DEBUG and a `rate` fraction of DEBUG records"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+def parse_levels(spec):
+    """Parse "module=LEVEL,other=LEVEL" into {module: LEVEL}"""
+    levels = {}
+    for part in spec.split(","):
+        name, sep, level = part.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_handler = None
+_configure_lock = threading.Lock()
+
+# [QueueHandler, output handlers, QueueListener] for every queue_handler()
+_queues = []
+_queues_lock = threading.Lock()
+
+def _start_listener(entry):
+    """(Re)start the thread draining a queue into its output handlers"""
+    handler, outputs, _ = entry
+    handler.queue = queue.SimpleQueue()
+    entry[2] = logging.handlers.QueueListener(handler.queue, *outputs, respect_handler_level=False)
+    entry[2].start()
+
+def _restart_after_fork():
+    # Listener threads do not survive fork(); forked workers need their own
+    for entry in _queues:
+        _start_listener(entry)
+
+def _stop_listeners():
+    for _, _, listener in _queues:
+        listener.stop()
+
+def queue_handler(*outputs):
+    """
+    A QueueHandler whose records are written to `outputs` by a listener
+    thread, so logging through it never blocks on I/O
+    """
+    handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    entry = [handler, outputs, None]
+    with _queues_lock:
+        if not _queues:
+            atexit.register(_stop_listeners)
+            # Not available on Windows, where there is no fork
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=_restart_after_fork)
+        _queues.append(entry)
+        _start_listener(entry)
+    return handler
+
+def configure_logging():
+    """Install the queue handler on the root logger and apply levels (idempotent)"""
+    global _handler
+    with _configure_lock:
+        if _handler is not None:
+            return
+        output = logging.StreamHandler(sys.stderr)
+        if LOG_FORMAT == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        _handler = queue_handler(output)
+        _handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+
+        root = logging.getLogger()
+        root.handlers = [_handler]
+        root.setLevel(LOG_LEVEL)
+        for name, level in parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
@@ -0,0 +1,179 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Pipeline stages are timed with `with timed("stage"):` into the
+`pipeline_stage_seconds` histogram; events are counted with
+`inc("name", label=value)`. `render()` produces the /metrics payload.
+
+When a request has a Server-Timing collector active (see
+`collect_server_timing`), every timed stage is also recorded for that
+request's Server-Timing header.
+
+Set METRICS_ENABLED=0 to turn every call into a no-op.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "0").lower() not in ("0", "false", "no")
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+# Per-request {stage: seconds}, set only while a Server-Timing collector is active
+_server_timing = contextvars.ContextVar("server_timing", default=None)
+# The stages of one request may run in several threadpool threads at once
+_server_timing_lock = threading.Lock()
+
+class Histogram:
+    """Cumulative-bucket histogram per label value"""
+
+    def __init__(self, name, help_text, label, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_value, (counts, total, count) in sorted(series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+class CounterFamily:
+    """Counters keyed by metric name and a sorted tuple of (label, value) pairs"""
+
+    def __init__(self):
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(values.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_collectors = []
+
+def register_collector(prefix, stats_fn):
+    """
+    Export stats_fn()'s numeric values as `<prefix>_<key>` at scrape time,
+    for components that already keep their own stats (caches)
+    """
+    _collectors.append((prefix, stats_fn))
+
+def _render_collectors():
+    lines = []
+    for prefix, stats_fn in _collectors:
+        try:
+            stats = stats_fn()
+        except Exception:
+            continue
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_{key} untyped")
+                lines.append(f"{prefix}_{key} {value:g}")
+    return lines
+
+stage_seconds = Histogram("pipeline_stage_seconds", "Time spent in each pipeline stage", "stage")
+request_seconds = Histogram("http_request_seconds", "Request latency by endpoint", "path")
+counters = CounterFamily()
+
+def observe_stage(stage, seconds):
+    """Record one stage duration (histogram and, if active, the request's Server-Timing)"""
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(stage, seconds)
+    timings = _server_timing.get()
+    if timings is not None:
+        with _server_timing_lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def _timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+def timed(stage):
+    """Context manager timing a pipeline stage (a shared no-op when metrics are off)"""
+    return _timed(stage) if METRICS_ENABLED else _NOOP
+
+def inc(name, amount=1, **labels):
+    """Increment counter `name` with the given labels"""
+    if METRICS_ENABLED:
+        counters.inc(name, amount, labels)
+
+def observe_request(path, seconds):
+    if METRICS_ENABLED:
+        request_seconds.observe(path, seconds)
+
+@contextmanager
+def collect_server_timing():
+    """Collect the stage timings of the current request; yields the {stage: seconds} dict"""
+    timings = {}
+    token = _server_timing.set(timings)
+    try:
+        yield timings
+    finally:
+        _server_timing.reset(token)
+
+def server_timing_header(timings, total=None):
+    """Format timings as a Server-Timing header value (durations in ms)"""
+    with _server_timing_lock:
+        timings = list(timings.items())
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = stage_seconds.render() + request_seconds.render() + counters.render() + _render_collectors()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Memoized hybrid_extract results (override through environment variables)
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "4096"))  # 0 disables the cache
+
+def canonical_text(text):
+    """Lowercase and collapse whitespace so trivially different descriptions share an entry"""
+    return " ".join(text.lower().split())
+
+class ExtractionCache:
+    """
+    Bounded in-process LRU of extraction results keyed by
+    (canonical text, model version). Entries of an older model version are
+    dropped as soon as a newer version is seen.
+    """
+
+    def __init__(self, max_entries=EXTRACTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "invalidations": 0}
+
+    def _check_version(self, version):
+        """Drop every entry when the model version changes; caller holds the lock"""
+        if version != self._version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, text, version):
+        """Cached items for canonical text under version, or None"""
+        with self._lock:
+            self._check_version(version)
+            items = self._entries.get(text)
+            if items is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(text)
+            self._stats["hits"] += 1
+        # Callers get their own dicts so they cannot change the cached entry
+        return [dict(item) for item in items]
+
+    def set(self, text, version, items):
+        if self.max_entries <= 0:
+            return
+        items = [dict(item) for item in items]
+        with self._lock:
+            self._check_version(version)
+            self._entries[text] = items
+            self._entries.move_to_end(text)
+            self._stats["sets"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["model_version"] = self._version
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+_cache = ExtractionCache()
+
+def get_extraction_cache():
+    """Return the process-wide extraction cache"""
+    return _cache
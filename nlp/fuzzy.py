@@ -0,0 +1,75 @@
+"""
+Fuzzy string similarity shared by the extractor and the USDA lookups.
+
+Scores are exactly difflib's SequenceMatcher(None, a, b).ratio(), so existing
+thresholds keep their meaning. Scoring one query against many choices is
+done in two steps. First a cheap upper bound of the ratio drops every
+choice that cannot pass the threshold: rapidfuzz's Indel similarity
+(2 * LCS / total length, computed in C) when rapidfuzz is installed,
+difflib's quick_ratio() otherwise. Then the survivors are rescored with
+difflib.
+"""
+
+from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz import process as _rf_process
+    from rapidfuzz.distance import Indel as _Indel
+    HAVE_RAPIDFUZZ = True
+except ImportError:
+    HAVE_RAPIDFUZZ = False
+
+# Slack on the prefilter cutoff so float rounding never drops a choice
+# whose exact ratio is just above the threshold
+_EPSILON = 1e-9
+
+def ratio(a, b):
+    """difflib similarity ratio of two strings (0.0 - 1.0)"""
+    return SequenceMatcher(None, a, b).ratio()
+
+def _upper_bounds(query, choices, cutoff):
+    """(index, bound) for choices whose ratio upper bound is at least cutoff"""
+    if HAVE_RAPIDFUZZ:
+        matches = _rf_process.extract(
+            query, choices, scorer=_Indel.normalized_similarity, processor=None,
+            score_cutoff=max(cutoff - _EPSILON, 0.0), limit=None,
+        )
+        return [(index, bound) for _, bound, index in matches]
+
+    bounds = []
+    matcher = SequenceMatcher(None, b=query)
+    for index, choice in enumerate(choices):
+        # set_seq1 keeps the analysis of the query (seq2) between choices
+        matcher.set_seq1(choice)
+        bound = matcher.quick_ratio()
+        if bound >= cutoff - _EPSILON:
+            bounds.append((index, bound))
+    return bounds
+
+def scores_above(query, choices, threshold):
+    """
+    Ratio of query against every choice, aligned with choices.
+    Choices whose ratio is not above threshold get 0.0
+    """
+    scores = [0.0] * len(choices)
+    for index, _ in _upper_bounds(query, choices, threshold):
+        score = ratio(query, choices[index])
+        if score > threshold:
+            scores[index] = score
+    return scores
+
+def best_match(query, choices, threshold=0.0):
+    """
+    (index, ratio) of the best choice with a ratio above threshold, or
+    (None, 0.0) when there is none. Ties go to the earliest choice
+    """
+    best_index, best_score = None, 0.0
+    candidates = sorted(_upper_bounds(query, choices, threshold), key=lambda c: (-c[1], c[0]))
+    for index, bound in candidates:
+        if best_index is not None and bound < best_score - _EPSILON:
+            # Bounds are sorted, so no remaining choice can beat the best
+            break
+        score = ratio(query, choices[index])
+        if score > threshold and (score > best_score or (score == best_score and index < best_index)):
+            best_index, best_score = index, score
+    return best_index, best_score
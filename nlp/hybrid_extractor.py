@@ -1,37 +1,65 @@
-from .rules import rule_based_extraction
-from .spacy_model import load_trained_model
-from difflib import SequenceMatcher
+from .lexicon import get_food_lexicon
+from .rule_engine import rule_based_extraction
+from .extraction_cache import canonical_text, get_extraction_cache
+from .spacy_model import get_model, get_model_and_version
+from . import fuzzy
+import logging
+import metrics
 import re  # Added missing import
 
-nlp_model = load_trained_model()  # loads or returns None
+logger = logging.getLogger(__name__)
+
+def __getattr__(name):
+    # `nlp_model` is loaded on first use (see spacy_model.get_model)
+    if name == "nlp_model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Defaults for batched spaCy inference (hybrid_extract_many)
+SPACY_BATCH_SIZE = 256
+SPACY_N_PROCESS = 1
+
+def _foods_from_doc(doc):
+    """FOOD entities of a processed doc, lowercased and de-duplicated in order"""
+    results = []
+    
+    # Extract entities labeled as "FOOD"
+    for ent in doc.ents:
+        if ent.label_ == "FOOD":
+            food_name = ent.text.lower().strip()
+            if food_name and len(food_name) > 1:
+                results.append(food_name)
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_results = []
+    for item in results:
+        if item not in seen:
+            seen.add(item)
+            unique_results.append(item)
+    
+    return unique_results
 
 def spacy_extract(nlp, text):
     """Extract food entities using spaCy model"""
     try:
-        doc = nlp(text)
-        results = []
-        
-        # Extract entities labeled as "FOOD"
-        for ent in doc.ents:
-            if ent.label_ == "FOOD":
-                food_name = ent.text.lower().strip()
-                if food_name and len(food_name) > 1:
-                    results.append(food_name)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_results = []
-        for item in results:
-            if item not in seen:
-                seen.add(item)
-                unique_results.append(item)
-        
-        return unique_results
+        return _foods_from_doc(nlp(text))
     
     except Exception as e:
-        print(f"spaCy extraction error: {e}")
+        logger.warning("spaCy extraction error: %s", e)
         return []
 
+def spacy_extract_many(nlp, texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS):
+    """Extract food entities for many texts with one nlp.pipe pass"""
+    try:
+        docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        return [_foods_from_doc(doc) for doc in docs]
+    
+    except Exception as e:
+        # Fall back to one call per text so a bad batch degrades like spacy_extract
+        logger.warning("spaCy batch extraction error: %s", e)
+        return [spacy_extract(nlp, text) for text in texts]
+
 def merge_extractions(rule_items, spacy_foods):
     """Merge rule-based and spaCy extractions intelligently"""
     if not spacy_foods:
@@ -50,6 +78,7 @@ def merge_extractions(rule_items, spacy_foods):
     
     merged_items = []
     used_spacy_foods = set()
+    food_lexicon = get_food_lexicon()
     
     for rule_item in rule_items:
         rule_ingredient = rule_item["ingredient"].lower()
@@ -57,10 +86,11 @@ def merge_extractions(rule_items, spacy_foods):
         best_score = 0.0
         
         # Find the best spaCy match for this rule-based item
-        for spacy_food in clean_spacy_foods:
-            if spacy_food in used_spacy_foods:
-                continue
-                
+        available_foods = [food for food in clean_spacy_foods if food not in used_spacy_foods]
+        # Similarity scores in one batch (0.0 for foods not above the 0.7 threshold)
+        similarity_scores = fuzzy.scores_above(rule_ingredient, available_foods, 0.7)
+        
+        for spacy_food, similarity_score in zip(available_foods, similarity_scores):
             # Check for exact or substring matches
             if spacy_food == rule_ingredient:
                 score = 1.0  # Perfect match
@@ -70,7 +100,7 @@ def merge_extractions(rule_items, spacy_foods):
                 score = 0.8  # Rule ingredient is contained in spaCy food
             else:
                 # Use sequence matching for similarity
-                score = SequenceMatcher(None, rule_ingredient, spacy_food).ratio()
+                score = similarity_score
             
             if score > best_score and score > 0.7:  # Higher threshold
                 best_match = spacy_food
@@ -93,11 +123,7 @@ def merge_extractions(rule_items, spacy_foods):
     for spacy_food in clean_spacy_foods:
         if spacy_food not in used_spacy_foods:
             # Only add if it's clearly a food item
-            food_keywords = ['chicken', 'beef', 'pork', 'fish', 'salmon', 'tuna', 'rice', 'bread', 'pasta', 
-                           'apple', 'banana', 'orange', 'milk', 'cheese', 'egg', 'potato', 'tomato', 
-                           'broccoli', 'spinach', 'carrot', 'yogurt', 'oats', 'quinoa']
-            
-            is_clear_food = any(keyword in spacy_food for keyword in food_keywords)
+            is_clear_food = food_lexicon.contains_any(spacy_food)
             
             if is_clear_food or len(spacy_food) >= 4:  # Longer words more likely to be real foods
                 merged_items.append({
@@ -147,40 +173,132 @@ def consolidate_items(items):
     
     return result
 
-def hybrid_extract(text):
-    """
-    Main extraction function that combines rule-based and spaCy approaches
-    """
-    if not text or not text.strip():
-        return []
+def _combine_extractions(rule_items, spacy_foods):
+    """Merge rule-based items with spaCy foods and consolidate duplicates"""
+    # Step 3: Merge the extractions
+    if spacy_foods:
+        merged_items = merge_extractions(rule_items, spacy_foods)
+    else:
+        merged_items = rule_items
+    
+    # Step 4: Consolidate duplicate ingredients
+    final_items = consolidate_items(merged_items)
     
+    # Debug output (formatted only when DEBUG is enabled for this module)
+    logger.debug("Rule-based extracted: %s", rule_items)
+    logger.debug("Final items: %s", final_items)
+    
+    return final_items
+
+def _extract(text, nlp_model):
+    """Uncached hybrid extraction of one non-empty text"""
     # Step 1: Always run rule-based extraction (provides quantities and units)
-    rule_items = rule_based_extraction(text)
+    with metrics.timed("rule_based_extraction"):
+        rule_items = rule_based_extraction(text)
     
     # Step 2: If spaCy model is available, use it to enhance ingredient names
     spacy_foods = []
     if nlp_model:
         try:
-            spacy_foods = spacy_extract(nlp_model, text)
-            print(f"SpaCy extracted: {spacy_foods}")  # Debug output
+            with metrics.timed("spacy_extract"):
+                spacy_foods = spacy_extract(nlp_model, text)
+            logger.debug("SpaCy extracted: %s", spacy_foods)
         except Exception as e:
-            print(f"SpaCy model error: {e}")
+            logger.warning("SpaCy model error: %s", e)
             spacy_foods = []
     
-    # Step 3: Merge the extractions
-    if spacy_foods:
-        merged_items = merge_extractions(rule_items, spacy_foods)
-    else:
-        merged_items = rule_items
+    with metrics.timed("merge_extractions"):
+        return _combine_extractions(rule_items, spacy_foods)
+
+def hybrid_extract(text):
+    """
+    Main extraction function that combines rule-based and spaCy approaches.
+    Extraction runs on the lowercased, whitespace-collapsed text and results
+    are memoized per (text, model version)
+    """
+    if not text or not text.strip():
+        return []
     
-    # Step 4: Consolidate duplicate ingredients
-    final_items = consolidate_items(merged_items)
+    text = canonical_text(text)
+    nlp_model, version = get_model_and_version()  # loads on first use or returns None
+    cache = get_extraction_cache()
     
-    # Debug output
-    print(f"Rule-based extracted: {rule_items}")
-    print(f"Final items: {final_items}")
+    items = cache.get(text, version)
+    if items is None:
+        items = _extract(text, nlp_model)
+        cache.set(text, version, items)
+    return items
+
+def hybrid_extract_many(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS):
+    """
+    hybrid_extract for a list of texts.
+    Texts missing from the memo run the spaCy step together through nlp.pipe
+    in batches of batch_size (over n_process processes); the result for each
+    text is identical to hybrid_extract(text)
+    """
+    texts = list(texts)
+    results = [[] for _ in texts]
+    nlp_model, version = get_model_and_version()
+    cache = get_extraction_cache()
     
-    return final_items
+    # Canonical text -> positions; empty descriptions extract nothing, as in hybrid_extract
+    pending = {}
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        text = canonical_text(text)
+        if text in pending:
+            pending[text].append(i)
+            continue
+        items = cache.get(text, version)
+        if items is None:
+            pending[text] = [i]
+        else:
+            results[i] = items
+    if not pending:
+        return results
+    
+    pending_texts = list(pending)
+    spacy_results = [[] for _ in pending_texts]
+    if nlp_model:
+        with metrics.timed("spacy_extract_batch"):
+            spacy_results = spacy_extract_many(
+                nlp_model, pending_texts, batch_size=batch_size, n_process=n_process
+            )
+    
+    for text, spacy_foods in zip(pending_texts, spacy_results):
+        with metrics.timed("rule_based_extraction"):
+            rule_items = rule_based_extraction(text)
+        with metrics.timed("merge_extractions"):
+            items = _combine_extractions(rule_items, spacy_foods)
+        cache.set(text, version, items)
+        for i in pending[text]:
+            results[i] = [dict(item) for item in items]
+    
+    return results
+
+def hybrid_extract_each(texts):
+    """
+    hybrid_extract_many for a batch of descriptions, as (items, error) per text.
+    When the batched pass fails each text is retried alone, so one bad text
+    does not fail the batch; a text that still fails gets [] and an error note
+    """
+    try:
+        return [(items, None) for items in hybrid_extract_many(texts)]
+    except Exception as e:
+        logger.error("Batch extraction failed, retrying per description: %s", e)
+    
+    extracted = []
+    for text in texts:
+        try:
+            extracted.append((hybrid_extract(text), None))
+        except Exception as e:
+            extracted.append(([], f"Extraction error: {str(e)}"))
+    return extracted
+
+def extraction_cache_stats():
+    """Hit rate and size of the hybrid_extract memo"""
+    return get_extraction_cache().stats()
 
 # Additional utility function for testing
 def test_hybrid_extract(test_cases):
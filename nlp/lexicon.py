@@ -0,0 +1,192 @@
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from pathlib import Path
+
+FOOD_LEXICON_PATH = os.getenv(
+    "FOOD_LEXICON_PATH", str(Path(__file__).resolve().parent.parent / "data" / "food_lexicon.txt")
+)
+
+def read_terms(path):
+    """Read one term per line, skipping blank lines and '#' comments"""
+    terms = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            term = line.split("#", 1)[0].strip().lower()
+            if term:
+                terms.append(term)
+    return terms
+
+class FoodLexicon:
+    """
+    Aho-Corasick automaton over a list of food terms.
+    Finds every term occurring in a text in one pass over the text,
+    however many terms the lexicon holds.
+
+    Nodes are numbered in depth-first order of the sorted terms, so a node's
+    first child is always the next node. Per-node data lives in flat int
+    arrays: the first child's character, the failure link, the term ending at
+    the node and the nearest failure-chain node that ends a term. Only the
+    other children of branching nodes need a dict entry.
+    """
+
+    def __init__(self, terms):
+        self.terms = sorted({term.lower() for term in terms if term})
+        # Joined form, indexed below for the "text is part of a term" check
+        self._joined = "\n".join(self.terms)
+
+        parents, codes, depths = self._build_trie()
+        self._link_failures(parents, codes, depths)
+        self._suffixes = self._index_suffixes()
+
+    def _build_trie(self):
+        """Fill the per-node arrays; returns each node's parent, character and depth"""
+        first_char = array("i", [-1])
+        term_at = array("i", [-1])
+        parents, codes, depths = array("i", [0]), array("i", [0]), array("i", [0])
+        branches = {}
+        path = [0]
+        previous = ""
+        for index, term in enumerate(self.terms):
+            # Sorted terms share their longest trie prefix with the previous term
+            shared = 0
+            for a, b in zip(previous, term):
+                if a != b:
+                    break
+                shared += 1
+            del path[shared + 1:]
+            node = path[-1]
+            # The rest of the term is a chain of new nodes, each the first child of the one before
+            first = len(first_char)
+            count = len(term) - shared
+            chain = [ord(ch) for ch in term[shared:]]
+            if first_char[node] < 0:
+                first_char[node] = chain[0]
+            else:
+                branches[node << 21 | chain[0]] = first
+            first_char.extend(chain[1:])
+            first_char.append(-1)
+            term_at.extend([-1] * count)
+            term_at[-1] = index
+            parents.append(node)
+            parents.extend(range(first, first + count - 1))
+            codes.extend(chain)
+            depths.extend(range(shared + 1, len(term) + 1))
+            path.extend(range(first, first + count))
+            previous = term
+
+        self._first_char = first_char
+        self._branches = branches
+        self._term_at = term_at
+        return parents, codes, depths
+
+    def _link_failures(self, parents, codes, depths):
+        """Failure links in breadth-first order, so shallower nodes are linked first"""
+        first_char, branches, term_at = self._first_char, self._branches, self._term_at
+        size = len(first_char)
+        fail = array("i", bytes(4 * size))
+        dict_link = array("i", bytes(4 * size))
+        for node in sorted(range(1, size), key=depths.__getitem__):
+            parent = parents[node]
+            if not parent:
+                continue
+            code = codes[node]
+            fallback = fail[parent]
+            while True:
+                if first_char[fallback] == code:
+                    target = fallback + 1
+                    break
+                target = branches.get(fallback << 21 | code, 0)
+                if target or not fallback:
+                    break
+                fallback = fail[fallback]
+            fail[node] = target
+            dict_link[node] = target if term_at[target] >= 0 else dict_link[target]
+        self._fail = fail
+        self._dict_link = dict_link
+
+    def _index_suffixes(self):
+        """Start offset in the joined terms of every term suffix, sorted by suffix"""
+        joined = self._joined + "\n"
+        starts = [start for start, ch in enumerate(self._joined) if ch != "\n"]
+        # Bucket by first character, then sort each bucket by its whole suffixes,
+        # so only one bucket's suffix strings exist at a time
+        starts.sort(key=joined.__getitem__)
+        suffixes = array("i")
+        for _, bucket in groupby(starts, key=joined.__getitem__):
+            suffixes.extend(sorted(bucket, key=lambda start: joined[start:joined.find("\n", start)]))
+        return suffixes
+
+    @classmethod
+    def from_file(cls, path=FOOD_LEXICON_PATH):
+        return cls(read_terms(path))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _child(self, node, code):
+        """The goto transition, 0 when node has no child for the character"""
+        if self._first_char[node] == code:
+            return node + 1
+        return self._branches.get(node << 21 | code, 0)
+
+    def _step(self, node, ch):
+        first_char, branches, fail = self._first_char, self._branches, self._fail
+        code = ord(ch)
+        while True:
+            if first_char[node] == code:
+                return node + 1
+            child = branches.get(node << 21 | code)
+            if child is not None:
+                return child
+            if not node:
+                return 0
+            node = fail[node]
+
+    def contains_any(self, text):
+        """True if any lexicon term occurs in text"""
+        step, term_at, dict_link = self._step, self._term_at, self._dict_link
+        node = 0
+        for ch in text.lower():
+            node = step(node, ch)
+            if term_at[node] >= 0 or dict_link[node]:
+                return True
+        return False
+
+    def find_all(self, text):
+        """All (start, end, term) occurrences of lexicon terms in text"""
+        terms, term_at, dict_link = self.terms, self._term_at, self._dict_link
+        matches = []
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            node = self._step(node, ch)
+            match = node if term_at[node] >= 0 else dict_link[node]
+            while match:
+                term = terms[term_at[match]]
+                matches.append((i + 1 - len(term), i + 1, term))
+                match = dict_link[match]
+        return matches
+
+    def is_part_of_term(self, text):
+        """True if text occurs inside some lexicon term"""
+        text = text.lower()
+        if not text or "\n" in text:
+            return False
+        # text is part of a term when it starts some term suffix
+        joined, width = self._joined, len(text)
+        i = bisect_left(self._suffixes, text, key=lambda start: joined[start:start + width])
+        return i < len(self._suffixes) and joined.startswith(text, self._suffixes[i])
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+def get_food_lexicon():
+    """Return the process-wide food lexicon, compiled on first use"""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                _lexicon = FoodLexicon.from_file(FOOD_LEXICON_PATH)
+    return _lexicon
@@ -0,0 +1,95 @@
+"""
+Process-pool extraction for CPU-bound bulk workloads.
+
+Rule-based extraction and the spaCy step hold the GIL, so threads do not
+help; ParallelExtractor fans hybrid_extract out over worker processes
+instead. Each worker loads the model once (in the pool initializer) and
+extracts whole chunks of texts with hybrid_extract_many, so inter-process
+traffic is one round trip per chunk. Results come back in input order.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger(__name__)
+
+# Texts per task sent to a worker
+PARALLEL_CHUNK_SIZE = int(os.getenv("PARALLEL_CHUNK_SIZE", "64"))
+
+# Worker processes (default: one per core)
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0")) or os.cpu_count() or 1
+
+# Chunks in flight per worker when streaming (ParallelExtractor.imap)
+CHUNKS_PER_WORKER = 2
+
+def _init_worker():
+    """Pool initializer: load the model once per worker process"""
+    from .spacy_model import warm_up
+    warm_up()
+
+def _extract_chunk(texts):
+    """Extract a chunk of texts in a worker: (items, error) per text, see hybrid_extract_each"""
+    from .hybrid_extractor import hybrid_extract_each
+    return hybrid_extract_each(texts)
+
+def _chunks(texts, size):
+    texts = iter(texts)
+    while True:
+        chunk = list(islice(texts, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ParallelExtractor:
+    """
+    hybrid_extract over a pool of worker processes.
+
+        with ParallelExtractor(processes=8) as extractor:
+            for items, error in extractor.imap(texts):
+                ...
+
+    `start_method` picks the multiprocessing start method ("fork", "spawn",
+    "forkserver"); the platform default when None. With "fork", a model
+    already loaded in the parent is inherited rather than reloaded
+    """
+
+    def __init__(self, processes=None, chunk_size=PARALLEL_CHUNK_SIZE, start_method=None):
+        self.processes = max(1, processes or PARALLEL_WORKERS)
+        self.chunk_size = max(1, chunk_size)
+        context = multiprocessing.get_context(start_method) if start_method else None
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=context, initializer=_init_worker
+        )
+
+    def extract_many(self, texts):
+        """(items, error) for every text of a list, in order"""
+        results = []
+        for chunk_results in self._executor.map(_extract_chunk, _chunks(texts, self.chunk_size)):
+            results.extend(chunk_results)
+        return results
+
+    def imap(self, texts):
+        """
+        Like extract_many, but lazily: texts are read from the iterable only as
+        workers free up, so an arbitrarily long stream runs in constant memory
+        """
+        pending = deque()
+        for chunk in _chunks(texts, self.chunk_size):
+            pending.append(self._executor.submit(_extract_chunk, chunk))
+            if len(pending) >= self.processes * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
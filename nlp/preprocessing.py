@@ -1,7 +1,17 @@
 import re
-import spacy
 
-nlp = spacy.blank("en")
+_nlp = None
+
+def __getattr__(name):
+    # `nlp` (a blank English pipeline) is built on first access so importing
+    # this module does not import spaCy
+    global _nlp
+    if name == "nlp":
+        if _nlp is None:
+            import spacy
+            _nlp = spacy.blank("en")
+        return _nlp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def clean_text(text: str) -> str:
     """Basic text cleaning for food descriptions"""
@@ -0,0 +1,396 @@
+"""
+Single-pass rule extraction engine.
+
+Drop-in replacement for `rules.parse_clause` / `rules.rule_based_extraction`
+that produces identical output without running the four `PATTERNS` regexes.
+A clause is scanned once to classify characters (letter / whitespace / digit)
+and to precompute, for every letter run, the last position where an
+ingredient may end. Each pattern's leftmost match is then found by walking
+the quantity/unit/word candidates in order, so the cost is linear in the
+clause length instead of quadratic (the regexes retry their nested
+`[a-zA-Z]+(?:\\s+[a-zA-Z]+)*` groups from every start position).
+"""
+
+import re
+from bisect import bisect_right
+
+from .rules import UNIT_ALIASES, clean_ingredient, is_likely_food, parse_number
+
+# Alternatives of the qty and unit groups, in the regexes' order
+QTY_WORDS = ("half", "quarter", "one", "two", "three", "four", "five",
+             "six", "seven", "eight", "nine", "ten", "a", "an")
+UNIT_WORDS = ("slice", "slices", "cup", "cups", "g", "gram", "grams", "kg", "ml", "l",
+              "tbsp", "tsp", "glass", "glasses", "bowl", "bowls", "piece", "pieces",
+              "serving", "servings", "oz", "ounce", "ounces", "lb", "pound", "pounds")
+
+# [a-zA-Z] with re.IGNORECASE also matches these four non-ASCII letters
+_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZİıſK")
+_CASE_FOLD = {"İ": "i", "ı": "i", "ſ": "s", "K": "k"}
+
+_LEADING_PHRASE_RE = re.compile(
+    r'^(i\s+had|i\s+ate|we\s+ordered|lunch\s+was|breakfast\s+was|dinner\s+was|for\s+breakfast|for\s+lunch|for\s+dinner)\s+',
+    flags=re.I
+)
+_LEADING_ARTICLE_RE = re.compile(r'^(a|an|some|the)\s+', flags=re.I)
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPACE_RUN_RE = re.compile(r'\s+')
+_LETTERS_RE = re.compile(r'[a-zA-Z]+', flags=re.I)
+_LETTER_RUN_RE = re.compile(r'[a-zA-Z\s]+', flags=re.I)
+_SEPARATORS_RE = re.compile(r'(?:,\s*|\s+and\s+|\s+with\s+|;\s*)', flags=re.I)
+_SKIP_PHRASES = ('for breakfast', 'for lunch', 'for dinner', 'i had', 'i ate', 'we ordered', 'lunch was', 'breakfast was')
+
+def _fold(ch):
+    """Case-fold one character the way re.IGNORECASE compares literals"""
+    return _CASE_FOLD.get(ch) or ch.lower()
+
+def _fold_text(text):
+    """Case-fold a whole string, keeping one character per input character"""
+    if text.isascii():
+        return text.lower()
+    folded = (_fold(ch) for ch in text)
+    return "".join(ch if len(ch) == 1 else "\0" for ch in folded)
+
+def _group_by_letter(words, index):
+    """Group alternatives by their first (index=0) or last (index=-1) letter, keeping their order"""
+    groups = {}
+    for word in words:
+        groups.setdefault(word[index], []).append(word)
+    return groups
+
+_QTY_BY_FIRST = _group_by_letter(QTY_WORDS, 0)
+_QTY_BY_LAST = _group_by_letter(QTY_WORDS, -1)
+_UNITS_BY_FIRST = _group_by_letter(UNIT_WORDS, 0)
+
+class _Clause:
+    """Character classes and lookahead tables for one clause, built in one pass"""
+
+    def __init__(self, text):
+        self.text = text
+        self.folded = _fold_text(text)
+        n = self.n = len(text)
+
+        # Whitespace runs: next_solid[i] is the first non-whitespace position >= i
+        self.is_space = is_space = [False] * (n + 1)
+        self.next_solid = next_solid = list(range(n + 1))
+        self.space_starts = []
+        for m in _SPACE_RUN_RE.finditer(text):
+            start, end = m.span()
+            is_space[start:end] = [True] * (end - start)
+            next_solid[start:end] = [end] * (end - start)
+            self.space_starts.append(start)
+
+        # Positions where the lookahead (?=\s*(?:and|,|with|$)) can land
+        anchors = {n}
+        for word in ("and", "with", ","):
+            pos = self.folded.find(word)
+            while pos >= 0:
+                anchors.add(pos)
+                pos = self.folded.find(word, pos + 1)
+        self.anchors = anchors
+
+        # Runs of letters/whitespace, the only text an ingredient can span.
+        # For each run keep its first letter and the last ingredient end
+        # accepted by the lookahead of patterns 1-3 (last_end) and of
+        # pattern 4 (last_end_any); -1 when there is none.
+        self.is_letter = is_letter = [False] * (n + 1)
+        self.run_start = [-1] * (n + 1)
+        self.last_end = [-1] * (n + 1)
+        self.last_end_any = [-1] * (n + 1)
+        self.runs = []
+        for m in _LETTER_RUN_RE.finditer(text):
+            start, end = m.span()
+            for letters in _LETTERS_RE.finditer(text, start, end):
+                is_letter[letters.start():letters.end()] = [True] * (letters.end() - letters.start())
+            first_letter = next_solid[start]
+            if first_letter >= end:
+                continue
+
+            last_end = last_end_any = -1
+            for e in range(end, first_letter, -1):
+                if not is_letter[e - 1]:
+                    continue
+                j = next_solid[e]
+                if j in anchors:
+                    last_end = e
+                    break
+                if last_end_any < 0 and (text[j] == "." or text.find("\n", e, j) >= 0):
+                    last_end_any = e
+            if last_end_any < 0:
+                last_end_any = last_end
+
+            size = end - start
+            self.run_start[start:end] = [first_letter] * size
+            self.last_end[start:end] = [last_end] * size
+            self.last_end_any[start:end] = [last_end_any] * size
+            self.runs.append((first_letter, end))
+
+        self._qty_candidates = None
+
+    def word_at(self, pos, word):
+        """Case-insensitive match of an ASCII word at pos"""
+        return self.folded.startswith(word, pos)
+
+    def words_at(self, pos, groups):
+        """Alternatives from `groups` (see _group_by_letter) matching at pos, in order"""
+        if pos >= self.n:
+            return ()
+        return [word for word in groups.get(self.folded[pos], ()) if self.folded.startswith(word, pos)]
+
+    def _lookahead(self, pos):
+        """(?=\\s*(?:and|,|with|$)) at pos"""
+        return self.next_solid[pos] in self.anchors
+
+    def qty_candidates(self):
+        """
+        (start, end) of every position where the qty group can match directly
+        before whitespace, leftmost first (one per whitespace-delimited chunk)
+        """
+        if self._qty_candidates is not None:
+            return self._qty_candidates
+
+        text = self.text
+        candidates = []
+        for end in self.space_starts:
+            if end == 0:
+                continue
+            # Numeric: longest suffix of the chunk matching \d+\.?\d*
+            k = end
+            while k > 0 and text[k - 1].isdecimal():
+                k -= 1
+            start = -1
+            if k < end:
+                start = k
+            if k > 0 and text[k - 1] == ".":
+                m = k - 1
+                while m > 0 and text[m - 1].isdecimal():
+                    m -= 1
+                if m < k - 1:
+                    start = m
+            if start < 0:
+                for word in _QTY_BY_LAST.get(self.folded[end - 1], ()):
+                    if self.folded.endswith(word, 0, end):
+                        start = end - len(word)
+                        break
+            if start >= 0:
+                candidates.append((start, end))
+
+        self._qty_candidates = candidates
+        return candidates
+
+    def ingredient_from(self, pos):
+        """End of a greedy ingredient starting at pos (patterns 1 and 3), or -1"""
+        if pos < self.n and self.is_letter[pos] and self.last_end[pos] > pos:
+            return self.last_end[pos]
+        return -1
+
+    def unit_tail(self, pos):
+        """
+        Match \\s*(?P<unit>UNIT)?s?(?=lookahead) at pos (pattern 2).
+        Returns (matched, unit) where unit is None when the group is empty
+        """
+        r = self.next_solid[pos]
+        n = self.n
+        for unit in self.words_at(r, _UNITS_BY_FIRST):
+            t = r + len(unit)
+            if t < n and self.folded[t] == "s" and self._lookahead(t + 1):
+                return True, self.text[r:t]
+            if self._lookahead(t):
+                return True, self.text[r:t]
+        if r < n and self.folded[r] == "s" and self._lookahead(r + 1):
+            return True, None
+        if self._lookahead(r):
+            return True, None
+        return False, None
+
+def _match_quantity_unit_ingredient(clause):
+    """Pattern 1: "two slices of bread", "200 g of rice", "1 cup rice" """
+    n = clause.n
+    for qty_start, qty_end in clause.qty_candidates():
+        unit_start = clause.next_solid[qty_end]
+        unit_end = -1
+        for unit in clause.words_at(unit_start, _UNITS_BY_FIRST):
+            t = unit_start + len(unit)
+            if t + 1 < n and clause.folded[t] == "s" and clause.is_space[t + 1]:
+                unit_end, after = t, t + 1
+                break
+            if t < n and clause.is_space[t]:
+                unit_end, after = t, t
+                break
+        if unit_end < 0:
+            continue
+
+        start = clause.next_solid[after]
+        end = -1
+        if clause.word_at(start, "of") and start + 2 < n and clause.is_space[start + 2]:
+            of_start = clause.next_solid[start + 2]
+            end = clause.ingredient_from(of_start)
+            if end >= 0:
+                start = of_start
+        if end < 0:
+            end = clause.ingredient_from(start)
+        if end >= 0:
+            return {
+                "qty": clause.text[qty_start:qty_end],
+                "unit": clause.text[unit_start:unit_end],
+                "ingredient": clause.text[start:end],
+            }
+    return None
+
+def _match_ingredient_quantity(clause):
+    """Pattern 2: "chicken breast 200g", "rice 2 cups" """
+    text, n = clause.text, clause.n
+    space_starts = clause.space_starts
+    k = 0
+    for start, run_end in clause.runs:
+        # Try each word end of this run followed by whitespace, shortest ingredient first
+        k = bisect_right(space_starts, start, k)
+        while k < len(space_starts) and space_starts[k] < run_end:
+            i = space_starts[k]
+            k += 1
+            if not clause.is_letter[i - 1]:
+                continue
+            q = clause.next_solid[i]
+            if q == n:
+                continue
+            if text[q].isdecimal():
+                qty_end = q
+                while qty_end < n and text[qty_end].isdecimal():
+                    qty_end += 1
+                if qty_end < n and text[qty_end] == ".":
+                    qty_end += 1
+                    while qty_end < n and text[qty_end].isdecimal():
+                        qty_end += 1
+                qty_ends = (qty_end,)
+            else:
+                qty_ends = [q + len(word) for word in clause.words_at(q, _QTY_BY_FIRST)]
+            for qty_end in qty_ends:
+                matched, unit = clause.unit_tail(qty_end)
+                if matched:
+                    return {"ingredient": text[start:i], "qty": text[q:qty_end], "unit": unit}
+    return None
+
+def _match_quantity_ingredient(clause):
+    """Pattern 3: quantity + ingredient without unit: "2 eggs", "3 apples" """
+    for qty_start, qty_end in clause.qty_candidates():
+        start = clause.next_solid[qty_end]
+        end = clause.ingredient_from(start)
+        if end >= 0:
+            return {"qty": clause.text[qty_start:qty_end], "ingredient": clause.text[start:end]}
+    return None
+
+def _match_ingredient(clause):
+    """Pattern 4: just the ingredient name"""
+    for start, _ in clause.runs:
+        end = clause.last_end_any[start]
+        if end > start:
+            return {"ingredient": clause.text[start:end]}
+    return None
+
+MATCHERS = (
+    _match_quantity_unit_ingredient,
+    _match_ingredient_quantity,
+    _match_quantity_ingredient,
+    _match_ingredient,
+)
+
+def parse_clause(clause):
+    """Parse a single clause to extract ingredient, quantity, and unit (same output as rules.parse_clause)"""
+    clause = clause.strip()
+    if not clause:
+        return None
+
+    clause = _LEADING_PHRASE_RE.sub('', clause)
+    clause = _LEADING_ARTICLE_RE.sub('', clause)
+
+    scanned = _Clause(clause)
+    food_checks = {}
+
+    best_match = None
+    best_score = 0
+
+    for i, matcher in enumerate(MATCHERS):
+        groups = matcher(scanned)
+        if groups is None:
+            continue
+
+        ingredient = clean_ingredient(groups.get("ingredient", ""))
+        qty_str = groups.get("qty", "1")
+        unit = groups.get("unit", "serving")
+
+        if not ingredient or len(ingredient) < 2:
+            continue
+
+        if ingredient not in food_checks:
+            food_checks[ingredient] = is_likely_food(ingredient)
+
+        score = 0
+        if food_checks[ingredient]:
+            score += 3
+        if qty_str and qty_str != "1":
+            score += 2
+        if unit and unit != "serving":
+            score += 1
+        score += (4 - i) * 0.1
+
+        if score > best_score:
+            best_score = score
+            quantity = parse_number(qty_str)
+            unit_norm = UNIT_ALIASES.get(unit.lower() if unit else "serving",
+                                         unit.lower() if unit else "serving")
+            best_match = {
+                "ingredient": ingredient,
+                "quantity": quantity,
+                "unit": unit_norm
+            }
+
+    return best_match
+
+def _split_on_and(text):
+    """Linear-time equivalent of re.search(r'(.+?)\\s+and\\s+(.+)', text, re.I) on normalized text"""
+    n = len(text)
+    for i in range(1, n - 5):
+        if (text[i] == " " and text[i + 4] == " "
+                and _fold(text[i + 1]) == "a" and _fold(text[i + 2]) == "n" and _fold(text[i + 3]) == "d"):
+            return text[:i], text[i + 5:]
+    return None
+
+def rule_based_extraction(text):
+    """Extract food items from text (same output as rules.rule_based_extraction)"""
+    if not text:
+        return []
+
+    text = _WHITESPACE_RE.sub(' ', text.strip())
+    parts = _SEPARATORS_RE.split(text)
+
+    items = []
+    seen_ingredients = set()
+
+    for part in parts:
+        part = part.strip()
+        if not part or len(part) < 2:
+            continue
+
+        part_lower = part.lower()
+        if any(phrase in part_lower for phrase in _SKIP_PHRASES):
+            continue
+
+        parsed = parse_clause(part)
+        if parsed and parsed["ingredient"] not in seen_ingredients:
+            items.append(parsed)
+            seen_ingredients.add(parsed["ingredient"])
+
+    if not items:
+        halves = _split_on_and(text)
+        if halves:
+            for part in halves:
+                parsed = parse_clause(part.strip())
+                if parsed and parsed["ingredient"] not in seen_ingredients:
+                    items.append(parsed)
+                    seen_ingredients.add(parsed["ingredient"])
+
+        if not items:
+            parsed = parse_clause(text)
+            if parsed:
+                items.append(parsed)
+
+    return items
@@ -1,5 +1,6 @@
 import re
 from word2number import w2n
+from .lexicon import get_food_lexicon
 
 # Expanded unit normalization map
 UNIT_ALIASES = {
@@ -20,7 +21,14 @@ UNIT_ALIASES = {
     "portion": "serving", "portions": "serving"
 }
 
-# Expanded common foods list
+# Common word-to-number mappings
+WORD_NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "half": 0.5, "quarter": 0.25, "a": 1, "an": 1
+}
+
+# Expanded common foods list (the lexicon in data/food_lexicon.txt extends it)
 COMMON_FOODS = [
     # Grains and starches
     "rice", "bread", "pasta", "noodles", "quinoa", "oats", "wheat", "barley",
@@ -95,15 +103,8 @@ def parse_number(qty_str):
     
     # Handle word numbers
     try:
-        # Common word-to-number mappings
-        word_numbers = {
-            "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
-            "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
-            "half": 0.5, "quarter": 0.25, "a": 1, "an": 1
-        }
-        
-        if qty_str in word_numbers:
-            return float(word_numbers[qty_str])
+        if qty_str in WORD_NUMBERS:
+            return float(WORD_NUMBERS[qty_str])
         
         # Try word2number library
         return float(w2n.word_to_num(qty_str))
@@ -144,26 +145,19 @@ def is_likely_food(ingredient):
     
     ingredient_lower = ingredient.lower()
     
-    # Check against known foods
-    for food in COMMON_FOODS:
-        if food in ingredient_lower or ingredient_lower in food:
-            return True
-    
-    # Additional heuristics
-    food_indicators = [
-        "chicken", "beef", "pork", "fish", "meat", "bread", "rice", "pasta",
-        "apple", "banana", "fruit", "vegetable", "milk", "cheese", "egg",
-        "potato", "tomato", "onion", "garlic", "oil", "butter", "yogurt"
-    ]
-    
-    for indicator in food_indicators:
-        if indicator in ingredient_lower:
-            return True
+    # Check against known foods (one pass over the text, see nlp/lexicon.py)
+    lexicon = get_food_lexicon()
+    if lexicon.contains_any(ingredient_lower):
+        return True
     
     # If ingredient has reasonable length and contains only letters/spaces
     if 2 <= len(ingredient_lower) <= 50 and re.match(r'^[a-z\s\-]+$', ingredient_lower):
         return True
     
+    # Fragments of known foods ("a" in "banana")
+    if lexicon.is_part_of_term(ingredient_lower):
+        return True
+    
     return False
 
 def parse_clause(clause):
@@ -1,12 +1,164 @@
-import spacy
+import hashlib
+import logging
+import os
+import threading
+import time
 from pathlib import Path
 
-def load_trained_model(model_path="models/food_ner"):
+from .lexicon import get_food_lexicon
+
+logger = logging.getLogger(__name__)
+
+# Trained food NER model served by the API
+MODEL_PATH = os.getenv("FOOD_NER_MODEL", "models/food_ner")
+
+# Seconds between checks of the model files for changes (a changed model is reloaded)
+MODEL_CHECK_INTERVAL = float(os.getenv("FOOD_NER_CHECK_INTERVAL", "5"))
+
+# "ner" loads only the components needed for doc.ents; "full" loads the whole pipeline
+SERVING_MODE = os.getenv("SPACY_SERVING_MODE", "ner")
+
+# Factories of components that set doc.ents, and of shared embedding layers they may listen to
+ENTITY_FACTORIES = {"ner", "beam_ner", "entity_ruler"}
+EMBEDDING_FACTORIES = {"tok2vec", "transformer"}
+
+# Text run through the model by warm_up() so the first request does not pay for it
+WARMUP_TEXT = "2 slices of whole wheat bread and 1 cup of milk"
+
+def _listener_upstreams(block):
+    """Names of the components that listener layers in a config block listen to"""
+    upstreams = set()
+    if isinstance(block, dict):
+        for key, value in block.items():
+            if key == "upstream" and isinstance(value, str):
+                upstreams.add(value)
+            else:
+                upstreams |= _listener_upstreams(value)
+    return upstreams
+
+def ner_exclude(model_path):
+    """
+    Components of a saved pipeline that doc.ents does not depend on.
+    Keeps the entity components and the embedding components they listen to;
+    everything else (tagger, parser, lemmatizer, ...) only sets token
+    attributes we never read
+    """
+    from spacy.util import load_config
+    config = load_config(Path(model_path) / "config.cfg", interpolate=False)
+    pipeline = config["nlp"]["pipeline"]
+    components = config.get("components", {})
+
+    def factory(name):
+        return components.get(name, {}).get("factory")
+
+    keep = {name for name in pipeline if factory(name) in ENTITY_FACTORIES}
+    if not keep:
+        # Not a pipeline we understand, so do not guess
+        return []
+    for name in list(keep):
+        for upstream in _listener_upstreams(components.get(name, {})):
+            if upstream == "*":
+                keep |= {other for other in pipeline if factory(other) in EMBEDDING_FACTORIES}
+            else:
+                keep.add(upstream)
+    return [name for name in pipeline if name not in keep]
+
+def load_trained_model(model_path=MODEL_PATH, mode=SERVING_MODE):
     p = Path(model_path)
     if p.exists() and p.is_dir():
         try:
-            return spacy.load(model_path)
+            # Imported here so importing this module does not pay spaCy's startup cost
+            import spacy
+            # Excluded components are not loaded at all, which saves memory too
+            exclude = ner_exclude(model_path) if mode == "ner" else []
+            return spacy.load(model_path, exclude=exclude)
         except Exception as e:
-            print("Failed to load spaCy model:", e)
+            logger.warning("Failed to load spaCy model: %s", e)
     # Return None when model unavailable
     return None
+
+def model_fingerprint(model_path=MODEL_PATH):
+    """Short hash of the model files' names, sizes and mtimes, or None when there is no model"""
+    p = Path(model_path)
+    if not p.is_dir():
+        return None
+    digest = hashlib.sha1()
+    for f in sorted(p.rglob("*")):
+        if f.is_file():
+            stat = f.stat()
+            digest.update(f"{f.relative_to(p)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:12]
+
+# (model, fingerprint of the files it was loaded from), swapped as one object
+_loaded = (None, None)
+_seen_fingerprint = None
+_checked_at = None
+_model_lock = threading.Lock()
+
+def _refresh_model(now):
+    """(Re)load the model when its files changed since the last check; caller holds _model_lock"""
+    global _loaded, _seen_fingerprint, _checked_at
+    fingerprint = model_fingerprint(MODEL_PATH)
+    if _checked_at is None or fingerprint != _seen_fingerprint:
+        model = load_trained_model(MODEL_PATH) if fingerprint is not None else None
+        if model is not None:
+            _loaded = (model, fingerprint)
+        elif fingerprint is None or _loaded[0] is None:
+            _loaded = (None, None)
+        # else: keep serving the previous model until the new files load
+        _seen_fingerprint = fingerprint
+    _checked_at = now
+
+def get_model_and_version():
+    """
+    Return (model, version) for the process-wide model, loading it on first
+    use; (None, None) when no model is available. Safe to call from several
+    threads at once. The model files are checked for changes at most every
+    MODEL_CHECK_INTERVAL seconds and the model is reloaded when they change.
+    The version is a fingerprint of the files the model was loaded from
+    """
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < MODEL_CHECK_INTERVAL:
+        return _loaded
+    with _model_lock:
+        if _checked_at is None or now - _checked_at >= MODEL_CHECK_INTERVAL:
+            _refresh_model(now)
+        return _loaded
+
+def get_model():
+    """Return the process-wide model (see get_model_and_version), or None"""
+    return get_model_and_version()[0]
+
+def warm_up():
+    """
+    Build the food lexicon, load the model and run one document through it.
+    Call it once per worker at startup. When it is called in a pre-fork
+    parent, the lexicon and the loaded model are shared copy-on-write with
+    the forked workers.
+    Returns True when a model is loaded
+    """
+    get_food_lexicon()
+    nlp = get_model()
+    if nlp is None:
+        return False
+    nlp(WARMUP_TEXT)
+    return True
+
+def component_timings(nlp, texts):
+    """
+    Time each pipeline step over texts, one document at a time.
+    Returns {step: milliseconds per document}, starting with the tokenizer
+    """
+    totals = {"tokenizer": 0.0}
+    totals.update((name, 0.0) for name in nlp.pipe_names)
+    count = 0
+    for text in texts:
+        start = time.perf_counter()
+        doc = nlp.make_doc(text)
+        totals["tokenizer"] += time.perf_counter() - start
+        for name, proc in nlp.pipeline:
+            start = time.perf_counter()
+            doc = proc(doc)
+            totals[name] += time.perf_counter() - start
+        count += 1
+    return {name: seconds * 1000 / max(count, 1) for name, seconds in totals.items()}
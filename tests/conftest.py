@@ -0,0 +1,27 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+# The service modules are imported from the project root (as app.py does)
+sys.path.insert(0, str(ROOT))
+
+@pytest.fixture
+def fixtures_dir():
+    return FIXTURES
+
+@pytest.fixture
+def stub():
+    """loadtest/stub_server.py on a free port, served from a background thread"""
+    from loadtest.stub_server import make_server
+
+    server = make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,84 @@
+import pytest
+
+from usda import cache as cache_module
+from usda.cache import NutrientCache, make_key
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # The module only calls time.time()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+def test_make_key_normalizes_the_query():
+    assert make_key("search", "  Chicken   BREAST ", ["SR Legacy", "Foundation"], pageSize=5) == \
+        make_key("search", "chicken breast", ["Foundation", "SR Legacy"], pageSize=5)
+
+def test_memory_hits_are_copies():
+    cache = NutrientCache(path="", ttl=60)
+    cache.set("k", {"foods": [1]})
+    cache.get("k")["foods"].append(2)
+    assert cache.get("k") == {"foods": [1]}
+
+def test_ttl_expiry(path, clock):
+    cache = NutrientCache(path=path, ttl=60)
+    cache.set("k", {"v": 1})
+    clock.now += 59
+    assert cache.get("k") == {"v": 1}
+
+    # Expired in memory and on disk
+    clock.now += 2
+    assert cache.get("k") is None
+    assert NutrientCache(path=path, ttl=60).get("k") is None
+    assert cache.stats()["expired"] == 1
+
+def test_memory_lru_eviction():
+    cache = NutrientCache(path="", ttl=0, memory_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+def test_disk_lru_eviction(path, clock, monkeypatch):
+    monkeypatch.setattr(cache_module, "_EVICTION_CHECK_INTERVAL", 1)
+    cache = NutrientCache(path=path, ttl=0, max_entries=2, memory_entries=0)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1  # touching "a" makes "b" the oldest
+    clock.now += 1
+    cache.set("c", 3)
+
+    reopened = NutrientCache(path=path, ttl=0, memory_entries=0)
+    assert [reopened.get(key) for key in "abc"] == [1, None, 3]
+    assert cache.stats()["evictions"] == 1
+
+def test_persists_across_reopen(path):
+    NutrientCache(path=path).set(make_key("food", 171477), {"fdcId": 171477})
+    reopened = NutrientCache(path=path)
+    assert reopened.get(make_key("food", 171477)) == {"fdcId": 171477}
+    assert reopened.stats()["disk_hits"] == 1
+    # Served from memory from then on
+    reopened.get(make_key("food", 171477))
+    assert reopened.stats()["memory_hits"] == 1
+
+def test_clear(path):
+    cache = NutrientCache(path=path)
+    cache.set("k", 1)
+    cache.clear()
+    assert cache.get("k") is None
+    assert NutrientCache(path=path).get("k") is None
@@ -0,0 +1,38 @@
+import pytest
+
+from usda import fooddata_api
+from usda.http_client import USDAClient
+
+@pytest.fixture
+def api(stub, monkeypatch):
+    client = USDAClient(f"http://127.0.0.1:{stub.server_address[1]}", api_key="stub", max_retries=0)
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: None)
+    monkeypatch.setattr(fooddata_api, "get_cache", lambda: None)
+    monkeypatch.setattr(fooddata_api, "USDA_API_KEY", "stub")
+    monkeypatch.setattr(fooddata_api, "_client", lambda: client)
+    return stub
+
+def _stats(stub):
+    with stub.state.lock:
+        return dict(stub.state.stats)
+
+def test_chunks_and_keeps_input_order(api):
+    known = sorted(api.state.foods)[:45]
+    ids = list(reversed(known)) + [known[0]]
+    foods = fooddata_api.get_foods_details(ids)
+    assert [food["fdcId"] for food in foods] == ids
+    # 45 distinct ids: 20 + 20 + 5
+    assert _stats(api) == {"foods_requests": 3, "foods_ids": 45}
+
+def test_missing_and_invalid_ids(api):
+    known = next(iter(api.state.foods))
+    foods = fooddata_api.get_foods_details([1, "abc", known, None, str(known), -5])
+    assert foods[0] is None and foods[1] is None and foods[3] is None and foods[5] is None
+    assert foods[2]["fdcId"] == foods[4]["fdcId"] == known
+    # Only the valid ids are sent, once each
+    assert _stats(api) == {"foods_requests": 1, "foods_ids": 2}
+
+def test_single_id(api):
+    known = next(iter(api.state.foods))
+    assert fooddata_api.get_food_details(known)["fdcId"] == known
+    assert fooddata_api.get_food_details("not an id") is None
@@ -0,0 +1,124 @@
+import time
+
+import pytest
+import requests
+
+import analysis
+from usda import fooddata_api
+from usda.http_client import CircuitBreaker, CircuitOpenError, USDAClient
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+def _client(server, **kwargs):
+    options = {"max_retries": 2, "backoff_base": 0.01, "backoff_max": 0.05,
+               "breaker": CircuitBreaker(failure_threshold=2, reset_timeout=0.2)}
+    options.update(kwargs)
+    return USDAClient(_url(server), api_key="stub", **options)
+
+def _stats(server):
+    return requests.get(f"{_url(server)}/_stats", timeout=5).json()
+
+def _search(client, query="apple"):
+    return client.get("/foods/search", params={"query": query, "pageSize": 1})
+
+def test_search(stub):
+    assert _search(_client(stub))["foods"][0]["description"].lower().startswith("apple")
+    assert _stats(stub) == {"search_requests": 1}
+
+def test_retries_upstream_errors(stub):
+    stub.state.error_rate = 1.0
+    with pytest.raises(requests.HTTPError):
+        _search(_client(stub))
+    # The first attempt and max_retries retries
+    assert _stats(stub) == {"search_requests": 3, "errors_injected": 3}
+
+def test_rate_limit_honours_retry_after(stub):
+    stub.state = type(stub.state)(0, 0, 0, rate_limit=1)
+    client = _client(stub, backoff_max=2)
+    _search(client)
+
+    # The bucket is empty: 429 with Retry-After: 1, then a successful retry
+    start = time.monotonic()
+    assert _search(client)["foods"]
+    assert time.monotonic() - start >= 0.9
+    assert _stats(stub) == {"search_requests": 3, "rate_limited": 1}
+
+def test_breaker_transitions(stub):
+    client = _client(stub, max_retries=0)
+    breaker = client.breaker
+    stub.state.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            _search(client)
+    assert breaker.state == "open"
+
+    # Open: fails fast without calling the upstream
+    with pytest.raises(CircuitOpenError):
+        _search(client)
+    assert _stats(stub)["search_requests"] == 2
+
+    # Half-open: a failed trial opens it again
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    with pytest.raises(requests.HTTPError):
+        _search(client)
+    assert breaker.state == "open"
+
+    # A successful trial closes it
+    time.sleep(0.25)
+    stub.state.error_rate = 0.0
+    assert _search(client)["foods"]
+    assert breaker.state == "closed"
+
+def test_trial_released_on_unexpected_error(stub, monkeypatch):
+    client = _client(stub, max_retries=0)
+    stub.state.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            _search(client)
+    time.sleep(0.25)
+    stub.state.error_rate = 0.0
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("bug")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(client.session, "request", broken)
+        with pytest.raises(RuntimeError):
+            _search(client)
+
+    # The trial was given up, so the next call becomes the trial
+    assert client.breaker.state == "half-open"
+    assert _search(client)["foods"]
+    assert client.breaker.state == "closed"
+
+@pytest.fixture
+def failing_api(stub, monkeypatch):
+    stub.state.error_rate = 1.0
+    client = _client(stub, max_retries=0)
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: None)
+    monkeypatch.setattr(fooddata_api, "resolve_ingredient", lambda ingredient: None)
+    monkeypatch.setattr(fooddata_api, "get_cache", lambda: None)
+    monkeypatch.setattr(fooddata_api, "USDA_API_KEY", "stub")
+    monkeypatch.setattr(fooddata_api, "_client", lambda: client)
+    return client
+
+def test_search_food_marks_mock_fallback(failing_api):
+    result = fooddata_api.search_food("apple")
+    assert result["source"] == "mock"
+    assert result["degraded"] is True
+    assert result["foods"][0]["description"] == "Apples, raw, with skin"
+
+def test_search_food_without_mock_raises(failing_api):
+    with pytest.raises(requests.RequestException):
+        fooddata_api.search_food("apple", allow_mock=False)
+
+def test_degraded_lookups_reach_the_items(failing_api):
+    items = [{"ingredient": "apple", "quantity": 2.0, "unit": "serving"},
+             {"ingredient": "zzzz", "quantity": 1.0, "unit": "serving"}]
+    assert fooddata_api.get_nutrition_for_item(items[0])["degraded"] is True
+    results = analysis.analyze_items(items)
+    assert [food_item.degraded for food_item, _ in results] == [True, True]
+    assert results[0][1]["calories"] == 104.0
+    assert results[1][0].note == "No USDA match found for 'zzzz'"
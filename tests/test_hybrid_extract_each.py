@@ -0,0 +1,21 @@
+from nlp import hybrid_extractor, parallel
+
+def test_batch_result(monkeypatch):
+    monkeypatch.setattr(hybrid_extractor, "hybrid_extract_many", lambda texts: [[{"text": text}] for text in texts])
+    assert hybrid_extractor.hybrid_extract_each(["a", "b"]) == [([{"text": "a"}], None), ([{"text": "b"}], None)]
+
+def test_failed_batch_is_retried_per_text(monkeypatch):
+    def batch(texts):
+        raise RuntimeError("batch failed")
+
+    def single(text):
+        if text == "bad":
+            raise ValueError("bad text")
+        return [{"text": text}]
+
+    monkeypatch.setattr(hybrid_extractor, "hybrid_extract_many", batch)
+    monkeypatch.setattr(hybrid_extractor, "hybrid_extract", single)
+    expected = [([{"text": "a"}], None), ([], "Extraction error: bad text"), ([{"text": "b"}], None)]
+    assert hybrid_extractor.hybrid_extract_each(["a", "bad", "b"]) == expected
+    # The process-pool workers run the same helper
+    assert parallel._extract_chunk(["a", "bad", "b"]) == expected
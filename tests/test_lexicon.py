@@ -0,0 +1,59 @@
+"""nlp.lexicon.FoodLexicon against the naive scans it replaces."""
+
+import random
+
+import pytest
+
+from nlp.lexicon import FOOD_LEXICON_PATH, FoodLexicon, read_terms
+
+SEED = 20240611
+
+def naive_find_all(terms, text):
+    text = text.lower()
+    return sorted((i, i + len(term), term) for term in terms
+                  for i in range(len(text)) if text.startswith(term, i))
+
+def naive_is_part_of_term(terms, text):
+    text = text.lower()
+    return bool(text) and any(text in term for term in terms)
+
+def _random_lexicons(rng, count=40):
+    # A small alphabet so terms share prefixes and suffixes
+    for _ in range(count):
+        yield ["".join(rng.choice("abn ,") for _ in range(rng.randint(1, 7)))
+               for _ in range(rng.randint(0, 30))]
+
+def test_matches_naive_scans():
+    rng = random.Random(SEED)
+    for words in _random_lexicons(rng):
+        lexicon = FoodLexicon(words)
+        terms = lexicon.terms
+        for _ in range(200):
+            text = "".join(rng.choice("abnAB ,\n") for _ in range(rng.randint(0, 14)))
+            expected = naive_find_all(terms, text)
+            assert sorted(lexicon.find_all(text)) == expected, (terms, text)
+            assert lexicon.contains_any(text) == bool(expected), (terms, text)
+            assert lexicon.is_part_of_term(text) == naive_is_part_of_term(terms, text), (terms, text)
+
+def test_food_lexicon_file():
+    terms = read_terms(FOOD_LEXICON_PATH)
+    lexicon = FoodLexicon(terms)
+    assert len(lexicon) == len(set(terms))
+    for term in lexicon.terms:
+        assert lexicon.contains_any(f"some {term.upper()} please")
+        assert lexicon.is_part_of_term(term[1:])
+
+@pytest.mark.parametrize("text, expected", [
+    ("pineapple", [(0, 9, "pineapple"), (4, 9, "apple")]),
+    ("Apple", [(0, 5, "apple")]),
+    ("grape", []),
+])
+def test_find_all_reports_overlapping_terms(text, expected):
+    lexicon = FoodLexicon(["apple", "pineapple", "Apple", ""])
+    assert sorted(lexicon.find_all(text)) == expected
+
+def test_empty_lexicon():
+    lexicon = FoodLexicon([])
+    assert not lexicon.contains_any("apple")
+    assert lexicon.find_all("apple") == []
+    assert not lexicon.is_part_of_term("a")
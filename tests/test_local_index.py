@@ -0,0 +1,59 @@
+import pytest
+
+from usda import fooddata_api
+from usda.local_index import LocalFoodIndex, build_index
+
+@pytest.fixture
+def index(tmp_path, fixtures_dir):
+    path = tmp_path / "fdc_index.json.gz"
+    assert build_index([fixtures_dir / "fdc_export_sample.json.gz"], path) == 6
+    return LocalFoodIndex.load(path)
+
+def _descriptions(result):
+    return [food["description"] for food in result["foods"]]
+
+def test_build_keeps_macros(index):
+    food = index.get(171477)
+    values = {n["nutrientId"]: n["value"] for n in food["foodNutrients"]}
+    assert food["description"].startswith("Chicken, broilers or fryers, breast")
+    assert values == {1008: 120.0, 1003: 22.5, 1005: 0.0, 1004: 2.62}
+    assert index.get(1) is None
+
+def test_search_hits(index):
+    assert _descriptions(index.search("chicken breast"))[0].startswith("Chicken, broilers")
+    assert _descriptions(index.search("apples"))[0].startswith("Apples, fuji")
+    assert _descriptions(index.search("brown rice"))[0].startswith("Rice, brown")
+    assert _descriptions(index.search("whole wheat bread"))[0].startswith("Bread, whole-wheat")
+
+def test_search_prefers_the_food_named_first(index):
+    # Both rice rows contain "rice"; "white" picks the white one
+    assert _descriptions(index.search("white rice"))[0].startswith("Rice, white")
+
+def test_search_misses(index):
+    assert index.search("tofu") == {"foods": []}
+    assert index.search("") == {"foods": []}
+
+def test_partial_token_match_is_a_miss(index):
+    # One shared token out of two is not enough coverage
+    assert index.search("almond milk") == {"foods": []}
+    assert index.search("beef stew") == {"foods": []}
+    assert _descriptions(index.search("almond milk", min_coverage=0.5))[0].startswith("Milk, whole")
+
+def test_search_food_uses_local_hit(index, monkeypatch):
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: index)
+    monkeypatch.setattr(fooddata_api, "mock_search_food", lambda query: pytest.fail("fell back on a hit"))
+    result = fooddata_api.search_food("chicken breast")
+    assert result["foods"][0]["fdcId"] == 171477
+
+def test_search_food_falls_back_on_miss(index, monkeypatch):
+    fallback = {"foods": [{"fdcId": 999, "description": "Fallback"}]}
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: index)
+    monkeypatch.setattr(fooddata_api, "USDA_API_KEY", "")
+    monkeypatch.setattr(fooddata_api, "USDA_API_FALLBACK", True)
+    monkeypatch.setattr(fooddata_api, "mock_search_food", lambda query: fallback)
+    assert fooddata_api.search_food("almond milk") == fallback
+
+def test_search_food_without_fallback_returns_the_miss(index, monkeypatch):
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: index)
+    monkeypatch.setattr(fooddata_api, "USDA_API_FALLBACK", False)
+    assert fooddata_api.search_food("almond milk") == {"foods": []}
@@ -0,0 +1,75 @@
+"""usda.nutrient_table must give the per-item values, with and without NumPy."""
+
+import random
+
+import pytest
+
+from usda import nutrient_table
+from usda.fooddata_api import scale_macros
+from usda.nutrient_table import MACRO_KEYS, NutrientTable, as_dicts, as_floats, group_totals, round2
+
+SEED = 20240612
+
+# Exact ties and values whose nearest double is just below or above a tie
+TIES = [0.125, 0.375, 2.675, 1.005, 1.015, 0.285, 10.245, 1234.565, -0.125, -2.675, 0.0, 5e-3, 1e15 + 0.125]
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def have_numpy(request, monkeypatch):
+    if request.param and not nutrient_table.HAVE_NUMPY:
+        pytest.skip("NumPy is not installed")
+    monkeypatch.setattr(nutrient_table, "HAVE_NUMPY", request.param)
+    return request.param
+
+def _macros(rng):
+    return {key: rng.choice((0.0, rng.uniform(0, 900), round(rng.uniform(0, 100), 3))) for key in MACRO_KEYS}
+
+def test_round2_ties(have_numpy):
+    rounded = as_floats(round2([TIES])[0])
+    assert rounded == [round(value, 2) for value in TIES]
+
+def test_round2_random(have_numpy):
+    rng = random.Random(SEED)
+    rows = [[rng.uniform(-1000, 1000) for _ in MACRO_KEYS] for _ in range(500)]
+    rows += [[rng.randrange(-100000, 100000) / 1000 for _ in MACRO_KEYS] for _ in range(500)]
+    assert as_dicts(round2(rows)) == [{key: round(value, 2) for key, value in zip(MACRO_KEYS, row)} for row in rows]
+
+def test_group_totals_match_the_totals_loop(have_numpy):
+    rng = random.Random(SEED)
+    rows = [[rng.uniform(0, 500) for _ in MACRO_KEYS] for _ in range(200)]
+    groups = [rng.randrange(5) for _ in rows]
+
+    expected = [[0.0] * len(MACRO_KEYS) for _ in range(6)]
+    for row, group in zip(rows, groups):
+        for i, value in enumerate(row):
+            expected[group][i] += value
+    expected = [{key: round(value, 2) for key, value in zip(MACRO_KEYS, total)} for total in expected]
+
+    # Group 5 has no rows and totals to zero
+    assert as_dicts(group_totals(rows, groups, 6)) == expected
+
+def test_group_totals_without_rows(have_numpy):
+    assert as_dicts(group_totals([], [], 2)) == [dict.fromkeys(MACRO_KEYS, 0.0)] * 2
+
+def test_scale_matches_scale_macros(have_numpy):
+    rng = random.Random(SEED)
+    table = NutrientTable()
+    foods = [_macros(rng) for _ in range(20)]
+    rows = [table.add(macros) for macros in foods]
+    picks = [rng.randrange(len(rows)) for _ in range(300)]
+    grams = [rng.choice((1.0, 30.0, 100.0, 150.0, rng.uniform(0, 1000))) for _ in picks]
+
+    expected = [scale_macros(foods[i], amount) for i, amount in zip(picks, grams)]
+    assert as_dicts(table.scale([rows[i] for i in picks], grams)) == expected
+
+def test_scale_without_rows(have_numpy):
+    table = NutrientTable()
+    table.add({"calories": 52.0})
+    assert as_dicts(table.scale([], [])) == []
+
+def test_rows_are_shared_per_key():
+    table = NutrientTable()
+    row = table.add({"calories": 52.0, "carbs_g": 13.8}, key=171688)
+    assert table.add({"calories": 0.0}, key=171688) == row
+    assert table.add({"calories": 0.0}) != row
+    assert len(table) == 2
+    assert table.row(row) == {"calories": 52.0, "protein_g": 0.0, "carbs_g": 13.8, "fat_g": 0.0}
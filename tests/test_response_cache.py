@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from response_cache import ResponseCache
+from usda import fooddata_api
+from usda.http_client import CircuitBreaker, USDAClient
+
+DESCRIPTION = {"description": "2 apples"}
+
+@pytest.fixture
+def client(stub, monkeypatch):
+    """The app, with USDA lookups going to the stub server and an empty response cache"""
+    usda = USDAClient(f"http://127.0.0.1:{stub.server_address[1]}", api_key="stub", max_retries=0,
+                      breaker=CircuitBreaker(failure_threshold=100))
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: None)
+    monkeypatch.setattr(fooddata_api, "resolve_ingredient", lambda ingredient: None)
+    monkeypatch.setattr(fooddata_api, "get_cache", lambda: None)
+    monkeypatch.setattr(fooddata_api, "USDA_API_KEY", "stub")
+    monkeypatch.setattr(fooddata_api, "_client", lambda: usda)
+    monkeypatch.setattr(app, "response_cache", ResponseCache(max_entries=16, ttl=0))
+    # Not entered as a context manager, so the lifespan warm-up does not run
+    return TestClient(app.app)
+
+def test_repeat_is_served_from_the_cache(client):
+    first = client.post("/analyze-text", json=DESCRIPTION)
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+
+    second = client.post("/analyze-text", json=DESCRIPTION)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.content == first.content
+
+def test_if_none_match_gets_304(client):
+    etag = client.post("/analyze-text", json=DESCRIPTION).headers["ETag"]
+
+    response = client.post("/analyze-text", json=DESCRIPTION, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    # A stale ETag gets the full body
+    response = client.post("/analyze-text", json=DESCRIPTION, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+def test_degraded_responses_are_not_cached(client, stub):
+    # USDA outage: the items come from the mock data and are marked degraded
+    stub.state.error_rate = 1.0
+    for _ in range(2):
+        response = client.post("/analyze-text", json=DESCRIPTION)
+        assert response.headers["X-Cache"] == "MISS"
+        assert [item["degraded"] for item in response.json()["items"]] == [True]
+    assert app.response_cache.stats()["sets"] == 0
+
+    # Once the API recovers the real response is computed and cached
+    stub.state.error_rate = 0.0
+    recovered = client.post("/analyze-text", json=DESCRIPTION)
+    assert recovered.headers["X-Cache"] == "MISS"
+    assert [item["degraded"] for item in recovered.json()["items"]] == [False]
+    assert client.post("/analyze-text", json=DESCRIPTION).headers["X-Cache"] == "HIT"
@@ -0,0 +1,88 @@
+"""Differential test: nlp.rule_engine must give exactly what the nlp.rules regexes give."""
+
+import random
+
+import pytest
+
+from nlp import rule_engine, rules
+
+SEED = 20240607
+CASES = 4000
+
+QUANTITIES = ("1", "2", "10", "1.5", "0.25", "1/2", "3/4", "2x", "a", "an", "one", "two", "ten",
+              "half", "quarter", "A", "Half", "TWO", "1,5", ".5")
+UNITS = ("g", "gram", "grams", "kg", "ml", "l", "cup", "cups", "Cup", "tbsp", "tsp", "slice", "slices",
+         "glass", "bowl", "piece", "serving", "oz", "ounces", "lb", "pound", "G", "ML",
+         # Non-ASCII letters that re.IGNORECASE matches against [a-zA-Z] and ASCII literals
+         "sl\u0131ce", "\u017ferving", "\u212ag", "p\u0130ece")
+WORDS = ("rice", "chicken", "breast", "apple", "apples", "milk", "bread", "whole", "wheat", "of", "and",
+         "with", "the", "some", "eggs", "toast", "butter", "banana", "oatmeal", "grilled", "coffee", "x",
+         "tea", "I", "had", "ate", "we", "ordered", "for", "breakfast", "lunch", "dinner", "was",
+         "Kale", "\u0130ce", "\u017falt", "b\u0131scuit", "\u212aale", "ha\u0131f")
+SEPARATORS = (" ", " ", " ", "  ", ", ", " and ", " with ", "; ", ",", "\t", " - ", ". ")
+PUNCTUATION = ("", "", "", "!", "?", ".", "(", ")", "'", "-", "2")
+
+def _token(rng):
+    kind = rng.random()
+    if kind < 0.25:
+        return rng.choice(QUANTITIES)
+    if kind < 0.4:
+        return rng.choice(UNITS)
+    return rng.choice(WORDS) + rng.choice(PUNCTUATION)
+
+def _structured(rng):
+    """A clause shaped like the patterns: quantity, unit, food words (each part optional)"""
+    parts = []
+    if rng.random() < 0.8:
+        parts.append(rng.choice(QUANTITIES))
+    if rng.random() < 0.7:
+        parts.append(rng.choice(UNITS))
+    if rng.random() < 0.3:
+        parts.append("of")
+    parts.extend(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+    if rng.random() < 0.2:
+        parts.append(rng.choice(QUANTITIES))
+    return rng.choice((" ", "  ", "")).join(parts)
+
+def generate(rng):
+    parts = []
+    for _ in range(rng.randint(0, 6)):
+        parts.append(_structured(rng) if rng.random() < 0.5 else _token(rng))
+        parts.append(rng.choice(SEPARATORS))
+    text = "".join(parts)
+    if rng.random() < 0.2:
+        text = rng.choice(("I had ", "for lunch ", "we ordered ", "Breakfast was ")) + text
+    return text
+
+@pytest.fixture(scope="module")
+def inputs():
+    rng = random.Random(SEED)
+    return [generate(rng) for _ in range(CASES)]
+
+def test_parse_clause_matches_regex_rules(inputs):
+    mismatches = [text for text in inputs if rule_engine.parse_clause(text) != rules.parse_clause(text)]
+    assert mismatches == []
+
+def test_rule_based_extraction_matches_regex_rules(inputs):
+    mismatches = [text for text in inputs
+                  if rule_engine.rule_based_extraction(text) != rules.rule_based_extraction(text)]
+    assert mismatches == []
+
+def test_inputs_exercise_every_pattern(inputs):
+    # Guard against the generator drifting into inputs no pattern matches
+    parsed = [rules.parse_clause(text) for text in inputs]
+    assert sum(result is not None for result in parsed) > CASES // 4
+    units = {result["unit"] for result in parsed if result}
+    assert len(units) > 5
+
+@pytest.mark.parametrize("text", [
+    "rice " * 200 + "1x",
+    "a cup " * 200 + "2x",
+    "2 cups of rice and 1 apple",
+    "half a glass of milk",
+    "",
+    "   ",
+])
+def test_edge_cases(text):
+    assert rule_engine.parse_clause(text) == rules.parse_clause(text)
+    assert rule_engine.rule_based_extraction(text) == rules.rule_based_extraction(text)
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from usda import fooddata_api
+from usda.singleflight import AsyncSingleFlight, SingleFlight
+
+N = 8
+
+def _run_threads(flight, fn):
+    """N threads calling flight.do("key", fn) while the first call is in flight"""
+    outcomes = [None] * N
+
+    def call(i):
+        try:
+            outcomes[i] = ("ok", flight.do("key", fn))
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(N)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def _blocking(flight, result=None, error=None):
+    """fn that returns (or raises) once all N callers have joined"""
+    def fn():
+        deadline = time.monotonic() + 5
+        while flight.stats()["calls"] < N and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if error is not None:
+            raise error
+        return result
+    return fn
+
+def test_thread_calls_collapse():
+    flight = SingleFlight()
+    outcomes = _run_threads(flight, _blocking(flight, result={"foods": []}))
+    assert outcomes == [("ok", {"foods": []})] * N
+    assert flight.stats() == {"calls": N, "executions": 1, "collapsed": N - 1}
+
+def test_thread_leader_error_reaches_every_caller():
+    flight = SingleFlight()
+    error = RuntimeError("upstream down")
+    outcomes = _run_threads(flight, _blocking(flight, error=error))
+    assert outcomes == [("error", error)] * N
+    # The key is released: the next call runs again
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.stats()["executions"] == 2
+
+async def _gather(flight, fn):
+    return await asyncio.gather(*(flight.do("key", fn) for _ in range(N)), return_exceptions=True)
+
+def test_async_calls_collapse():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        return {"foods": []}
+
+    assert asyncio.run(_gather(flight, fn)) == [{"foods": []}] * N
+    assert flight.stats() == {"calls": N, "executions": 1, "collapsed": N - 1}
+
+def test_async_leader_error_reaches_every_caller():
+    flight = AsyncSingleFlight()
+    error = RuntimeError("upstream down")
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise error
+
+    assert asyncio.run(_gather(flight, fn)) == [error] * N
+    assert flight.stats()["collapsed"] == N - 1
+
+def test_async_search_uses_the_search_food_key(monkeypatch):
+    keys = []
+    monkeypatch.setattr(fooddata_api, "get_local_index", lambda: None)
+    monkeypatch.setattr(fooddata_api, "get_cache", lambda: None)
+    monkeypatch.setattr(fooddata_api, "USDA_API_KEY", "stub")
+    monkeypatch.setattr(fooddata_api, "search_food_api", lambda query, limit: {"foods": [query]})
+
+    sync_flight = fooddata_api.search_flight
+    async_flight = AsyncSingleFlight()
+    monkeypatch.setattr(fooddata_api, "async_search_flight", async_flight)
+
+    def record_sync(key, fn, *args):
+        keys.append(("sync", key))
+        return fn(*args)
+
+    monkeypatch.setattr(sync_flight, "do", record_sync)
+    original_do = async_flight.do
+
+    async def record_async(key, fn, *args):
+        keys.append(("async", key))
+        return await original_do(key, fn, *args)
+
+    monkeypatch.setattr(async_flight, "do", record_async)
+
+    async def search_many():
+        return await asyncio.gather(*(fooddata_api.search_food_async(query) for query in ("Apple", " apple ") * 4))
+
+    results = asyncio.run(search_many())
+    assert all(result["foods"] for result in results)
+    async_keys = {key for kind, key in keys if kind == "async"}
+    sync_keys = {key for kind, key in keys if kind == "sync"}
+    # Both spellings share one async key, and it is the key search_food uses
+    assert len(async_keys) == 1 and async_keys == sync_keys
+    assert async_flight.stats() == {"calls": 8, "executions": 1, "collapsed": 7}
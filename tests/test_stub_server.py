@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from loadtest.stub_server import make_food
+
+def _post_foods(server, body):
+    return requests.post(f"http://127.0.0.1:{server.server_address[1]}/foods", data=body, timeout=5)
+
+def test_concurrent_synthetic_searches(stub):
+    queries = [f"food {i % 50}" for i in range(2000)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda query: stub.state.search(query, 5), queries))
+    assert all(result == [make_food(query)] for query, result in zip(queries, results))
+    # One synthetic food per query; the lexicon foods are untouched
+    assert len(stub.state.synthetic) == 50
+    assert make_food("food 7")["fdcId"] not in stub.state.foods
+
+def test_post_foods(stub):
+    known = next(iter(stub.state.foods))
+    synthetic = stub.state.search("zzz food", 1)[0]["fdcId"]
+    response = _post_foods(stub, f'{{"fdcIds": [{known}, "{synthetic}", 1]}}')
+    assert response.status_code == 200
+    assert [food["fdcId"] for food in response.json()] == [known, synthetic]
+
+@pytest.mark.parametrize("body", ['{"fdcIds": ["abc"]}', '{"fdcIds": 5}', '[1, 2]', "not json"])
+def test_post_foods_rejects_bad_ids(stub, body):
+    assert _post_foods(stub, body).status_code == 400
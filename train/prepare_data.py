@@ -0,0 +1,186 @@
+"""
+Generate weakly supervised NER training data.
+
+Builds meal descriptions from quantity/unit templates (the number words in
+WORD_NUMBERS and the unit spellings in UNIT_ALIASES) and food names from the
+lexicon, recording the character offsets of every food as a FOOD entity.
+Examples are written as DocBin shards of --shard-size docs, one shard at a
+time, so memory stays flat however many are generated; shards are produced
+in parallel by --workers processes and are reproducible for a given seed.
+Shards left in the output directory by an earlier run are removed first,
+since train_spacy.py reads every shard in the directory:
+    python train/prepare_data.py --count 1000000 [--shard-size 50000] [--workers 4] [-o data/weak]
+    python train/train_spacy.py --train data/weak
+
+--preview N prints N examples in the data/food_samples.json format instead.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import spacy
+from spacy.tokens import DocBin
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from nlp.lexicon import FOOD_LEXICON_PATH, read_terms
+from nlp.rules import COMMON_FOODS, UNIT_ALIASES, WORD_NUMBERS
+
+OUTPUT_DIR = pathlib.Path("data/weak")
+LABEL = "FOOD"
+
+QUANTITIES = ["1", "2", "3", "4", "5", "10", "50", "100", "150", "200", "250", "500",
+              "0.5", "1.5", "2.5", "1/2", "1/4", "3/4"] + sorted(WORD_NUMBERS)
+UNITS = sorted(UNIT_ALIASES)
+LEAD_INS = ["", "", "", "I had ", "I ate ", "Had ", "Ate ", "For breakfast I had ", "For lunch I had ",
+            "Lunch was ", "Dinner was ", "Dinner: ", "Breakfast: ", "Just finished ", "Snack - ", "Today I ate "]
+SEPARATORS = [" and ", " with ", ", ", ", and ", " plus ", " along with "]
+TRAILERS = ["", "", "", "", ".", " for lunch", " for dinner", " this morning", " after the gym", " today"]
+
+def load_foods(lexicon_path=FOOD_LEXICON_PATH):
+    return sorted(set(read_terms(lexicon_path)) | set(COMMON_FOODS))
+
+def _food_form(rng, food):
+    """Foods as users type them: mostly lowercase, sometimes capitalized"""
+    form = rng.random()
+    if form < 0.1:
+        return food.capitalize()
+    if form < 0.13:
+        return food.title()
+    return food
+
+def _item(rng, foods):
+    """(text before the food, food, text after the food) for one item"""
+    food = _food_form(rng, rng.choice(foods))
+    form = rng.random()
+    if form < 0.4:
+        return f"{rng.choice(QUANTITIES)} {rng.choice(UNITS)} of ", food, ""
+    if form < 0.6:
+        return f"{rng.choice(QUANTITIES)} {rng.choice(UNITS)} ", food, ""
+    if form < 0.75:
+        return f"{rng.choice(QUANTITIES)} ", food, ""
+    if form < 0.85:
+        return "", food, f" {rng.choice(QUANTITIES)} {rng.choice(UNITS)}"
+    if form < 0.9:
+        return "", food, f" {rng.choice(['100', '150', '200', '250'])}g"
+    return "", food, ""
+
+def generate_example(rng, foods, max_items=4):
+    """One description and its FOOD spans, as (text, {"entities": [[start, end, "FOOD"], ...]})"""
+    parts = [rng.choice(LEAD_INS)]
+    length = len(parts[0])
+    entities = []
+    for i in range(rng.randint(1, max_items)):
+        if i:
+            separator = rng.choice(SEPARATORS)
+            parts.append(separator)
+            length += len(separator)
+        before, food, after = _item(rng, foods)
+        start = length + len(before)
+        entities.append([start, start + len(food), LABEL])
+        parts.extend((before, food, after))
+        length = start + len(food) + len(after)
+    parts.append(rng.choice(TRAILERS))
+    return "".join(parts), {"entities": entities}
+
+def generate_examples(count, seed, foods, max_items=4):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield generate_example(rng, foods, max_items)
+
+def shard_seed(seed, index):
+    return seed * 1_000_003 + index
+
+_tokenizer = None
+
+def write_shard(path, count, seed, foods, max_items=4):
+    """Generate `count` examples into a DocBin at `path`; returns (docs, skipped spans)"""
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = spacy.blank("en").tokenizer
+
+    doc_bin = DocBin(attrs=["ENT_IOB", "ENT_TYPE"])
+    skipped = 0
+    for text, annotations in generate_examples(count, seed, foods, max_items):
+        doc = _tokenizer(text)
+        spans = []
+        for start, end, label in annotations["entities"]:
+            span = doc.char_span(start, end, label=label)
+            if span is None:
+                skipped += 1
+            else:
+                spans.append(span)
+        doc.ents = spans
+        doc_bin.add(doc)
+
+    # Write then rename, so an interrupted run never leaves a truncated shard
+    tmp_path = path.with_name(path.name + ".tmp")
+    doc_bin.to_disk(tmp_path)
+    os.replace(tmp_path, path)
+    return len(doc_bin), skipped
+
+def _write_shard(task):
+    return write_shard(*task)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000, help="Number of examples")
+    parser.add_argument("--shard-size", type=int, default=50_000, help="Examples per DocBin shard")
+    parser.add_argument("--max-items", type=int, default=4, help="Most food items per description")
+    parser.add_argument("--lexicon", default=FOOD_LEXICON_PATH, help="Food names, one per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preview", type=int, default=0, help="Print this many examples and exit")
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    foods = load_foods(args.lexicon)
+
+    if args.preview:
+        examples = list(generate_examples(args.preview, args.seed, foods, args.max_items))
+        print(json.dumps(examples, indent=2))
+        return
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    stale = sorted(args.output.glob("shard-*.spacy"))
+    for path in stale:
+        path.unlink()
+    if stale:
+        print(f"Removed {len(stale)} shards of an earlier run from {args.output}")
+
+    tasks = []
+    for index, start in enumerate(range(0, args.count, args.shard_size)):
+        size = min(args.shard_size, args.count - start)
+        path = args.output / f"shard-{index:05d}.spacy"
+        tasks.append((path, size, shard_seed(args.seed, index), foods, args.max_items))
+
+    start = time.perf_counter()
+    docs = skipped = 0
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = executor.map(_write_shard, tasks)
+            for (path, *_), (shard_docs, shard_skipped) in zip(tasks, results):
+                docs += shard_docs
+                skipped += shard_skipped
+                print(f"Wrote {path} ({shard_docs} docs)")
+    else:
+        for task in tasks:
+            shard_docs, shard_skipped = write_shard(*task)
+            docs += shard_docs
+            skipped += shard_skipped
+            print(f"Wrote {task[0]} ({shard_docs} docs)")
+    elapsed = time.perf_counter() - start
+
+    print(f"{docs} examples in {len(tasks)} shards in {elapsed:.1f}s ({docs / elapsed:,.0f} examples/sec) "
+          f"from {len(foods)} foods")
+    if skipped:
+        print(f"Skipped {skipped} entity spans that do not align with token boundaries")
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,167 @@
-import spacy
-from spacy.training.example import Example
-import random
+"""
+Train the food NER model.
+
+Training data can be JSON files in the data/food_samples.json format
+([text, {"entities": [[start, end, label], ...]}] pairs), DocBin (.spacy)
+files, or directories of DocBin shards (as written by train/prepare_data.py).
+JSON files are converted to DocBin once and cached, keyed by their content.
+
+Trains with compounding mini-batches, evaluates entity F1 on a held-out dev
+split after every epoch, keeps the best model and stops early when F1 stops
+improving:
+    python train/train_spacy.py [--train data/food_samples.json] [--dev-split 0.1] [--output models/food_ner]
+"""
+
+import argparse
+import hashlib
 import json
 import pathlib
+import random
+import time
+
+import spacy
+from spacy.tokens import DocBin
+from spacy.training.example import Example
+from spacy.util import filter_spans, fix_random_seed, minibatch
 
 # Paths
 DATA_PATH = pathlib.Path("data/food_samples.json")
 OUTPUT_DIR = pathlib.Path("models/food_ner")
+CACHE_DIR = pathlib.Path("data/cache/docbin")
 
-def load_data():
-    with open(DATA_PATH, "r") as f:
-        raw_data = json.load(f)
-    return raw_data
+def json_to_docbin(nlp, raw_data):
+    """Convert [text, {"entities": [...]}] pairs to a DocBin, dropping spans that do not align to tokens"""
+    doc_bin = DocBin(attrs=["ENT_IOB", "ENT_TYPE"])
+    skipped = 0
+    for text, annotations in raw_data:
+        doc = nlp.make_doc(text)
+        spans = []
+        for start, end, label in annotations.get("entities", []):
+            span = doc.char_span(start, end, label=label, alignment_mode="contract")
+            if span is None:
+                skipped += 1
+            else:
+                spans.append(span)
+        doc.ents = filter_spans(spans)
+        doc_bin.add(doc)
+    if skipped:
+        print(f"Skipped {skipped} entity spans that do not align with token boundaries")
+    return doc_bin
+
+def cached_docbin(nlp, json_path, cache_dir=CACHE_DIR):
+    """DocBin for a JSON file, converted once and cached by the file's content hash"""
+    content = pathlib.Path(json_path).read_bytes()
+    cache_path = pathlib.Path(cache_dir) / f"{pathlib.Path(json_path).stem}-{hashlib.sha1(content).hexdigest()[:12]}.spacy"
+    if cache_path.exists():
+        return DocBin().from_disk(cache_path)
+    doc_bin = json_to_docbin(nlp, json.loads(content))
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    doc_bin.to_disk(cache_path)
+    return doc_bin
+
+def load_docs(nlp, paths, cache_dir=CACHE_DIR):
+    """Annotated docs from JSON files, DocBin files and directories of DocBin shards"""
+    docs = []
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.is_dir():
+            files = sorted(path.glob("*.spacy"))
+        else:
+            files = [path]
+        for file in files:
+            if file.suffix == ".json":
+                doc_bin = cached_docbin(nlp, file, cache_dir)
+            else:
+                doc_bin = DocBin().from_disk(file)
+            docs.extend(doc_bin.get_docs(nlp.vocab))
+    return docs
+
+def make_examples(nlp, docs):
+    return [Example(nlp.make_doc(doc.text), doc) for doc in docs]
+
+def compounding(start, stop, compound):
+    """Batch sizes growing geometrically from start to stop"""
+    size = start
+    while True:
+        yield int(size)
+        size = min(size * compound, stop)
+
+def evaluate(nlp, examples):
+    scores = nlp.evaluate(examples)
+    return scores.get("ents_f") or 0.0, scores.get("ents_p") or 0.0, scores.get("ents_r") or 0.0
+
+def train(args):
+    fix_random_seed(args.seed)
+    rng = random.Random(args.seed)
 
-def main():
     # Load blank English model
     nlp = spacy.blank("en")
-    ner = nlp.add_pipe("ner")
 
-    # Add "FOOD" label
-    ner.add_label("FOOD")
+    docs = load_docs(nlp, args.train, args.cache_dir)
+    if args.dev:
+        train_docs, dev_docs = docs, load_docs(nlp, args.dev, args.cache_dir)
+    else:
+        rng.shuffle(docs)
+        dev_size = int(len(docs) * args.dev_split)
+        dev_docs, train_docs = docs[:dev_size], docs[dev_size:]
+    if not dev_docs:
+        print("No dev examples: evaluating on the training data")
+        dev_docs = train_docs
+
+    train_examples = make_examples(nlp, train_docs)
+    dev_examples = make_examples(nlp, dev_docs)
+    print(f"{len(train_examples)} training / {len(dev_examples)} dev examples")
 
-    # Load training data
-    TRAIN_DATA = load_data()
+    ner = nlp.add_pipe("ner")
+    # Add the labels found in the data ("FOOD")
+    for doc in train_docs:
+        for ent in doc.ents:
+            ner.add_label(ent.label_)
 
-    # Training loop
-    optimizer = nlp.begin_training()
-    for itn in range(20):  # 20 iterations (small dataset, keep low)
-        random.shuffle(TRAIN_DATA)
+    optimizer = nlp.initialize(lambda: train_examples)
+    best_f, best_epoch = -1.0, 0
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    for epoch in range(1, args.max_epochs + 1):
+        rng.shuffle(train_examples)
         losses = {}
-        for text, annotations in TRAIN_DATA:
-            doc = nlp.make_doc(text)
-            example = Example.from_dict(doc, annotations)
-            nlp.update([example], drop=0.2, losses=losses, sgd=optimizer)
-        print(f"Iteration {itn} Losses {losses}")
-
-    # Save model
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    nlp.to_disk(OUTPUT_DIR)
-    print(f"Model saved to {OUTPUT_DIR}")
+        words = 0
+        start = time.perf_counter()
+        sizes = compounding(args.batch_start, args.batch_stop, args.batch_compound)
+        for batch in minibatch(train_examples, size=sizes):
+            nlp.update(batch, drop=args.dropout, losses=losses, sgd=optimizer)
+            words += sum(len(example.reference) for example in batch)
+        elapsed = time.perf_counter() - start
+
+        ents_f, ents_p, ents_r = evaluate(nlp, dev_examples)
+        print(f"Epoch {epoch:>3}  loss {losses.get('ner', 0.0):>9.2f}  "
+              f"F {ents_f:.3f} (P {ents_p:.3f} R {ents_r:.3f})  {words / elapsed:,.0f} words/sec")
+
+        if ents_f > best_f:
+            best_f, best_epoch = ents_f, epoch
+            nlp.to_disk(args.output)
+        elif epoch - best_epoch >= args.patience:
+            print(f"No F1 improvement for {args.patience} epochs, stopping")
+            break
+
+    print(f"Best dev F {best_f:.3f} at epoch {best_epoch}; model saved to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", nargs="+", default=[DATA_PATH],
+                        help="JSON files, DocBin files or directories of DocBin shards")
+    parser.add_argument("--dev", nargs="+", help="Dev data (default: split off --dev-split of --train)")
+    parser.add_argument("--dev-split", type=float, default=0.1)
+    parser.add_argument("--output", type=pathlib.Path, default=OUTPUT_DIR)
+    parser.add_argument("--cache-dir", type=pathlib.Path, default=CACHE_DIR, help="Where converted JSON is cached")
+    parser.add_argument("--max-epochs", type=int, default=50)
+    parser.add_argument("--patience", type=int, default=5, help="Epochs without F1 improvement before stopping")
+    parser.add_argument("--batch-start", type=float, default=4.0)
+    parser.add_argument("--batch-stop", type=float, default=64.0)
+    parser.add_argument("--batch-compound", type=float, default=1.001)
+    parser.add_argument("--dropout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    train(parser.parse_args())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (override through environment variables)
+# Default path is in the project's data/ directory whatever the working directory,
+# so every worker shares one store; an empty string disables the disk store
+CACHE_PATH = os.getenv(
+    "USDA_CACHE_PATH", str(Path(__file__).resolve().parent.parent / "data" / "usda_cache.sqlite3")
+)
+CACHE_TTL = float(os.getenv("USDA_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+CACHE_MAX_ENTRIES = int(os.getenv("USDA_CACHE_MAX_ENTRIES", "50000"))  # disk store size limit
+CACHE_MEMORY_ENTRIES = int(os.getenv("USDA_CACHE_MEMORY_ENTRIES", "2048"))  # in-process LRU size
+CACHE_ENABLED = os.getenv("USDA_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# How many writes between two size checks of the disk store
+_EVICTION_CHECK_INTERVAL = 64
+
+def normalize_query(query):
+    """Normalize a search query so trivially different spellings share an entry"""
+    return " ".join(str(query).lower().split())
+
+def make_key(kind, query, data_types=None, **params):
+    """Build the cache key for a request: kind, normalized query, dataType and extra params"""
+    parts = [kind, normalize_query(query)]
+    if data_types:
+        parts.append(",".join(sorted(data_types)))
+    for name in sorted(params):
+        parts.append(f"{name}={params[name]}")
+    return "|".join(parts)
+
+class NutrientCache:
+    """
+    Two-level cache for USDA responses: an in-process LRU in front of a
+    SQLite store that survives restarts and is shared by all worker processes.
+    Entries expire after `ttl` seconds; the disk store is trimmed to
+    `max_entries` by evicting the least recently used rows.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES,
+                 memory_entries=CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "sets": 0,
+            "evictions": 0,
+        }
+
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connection(self):
+        """One SQLite connection per thread and per process (connections must not cross a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    def _remember(self, key, created, raw_value):
+        """Insert serialized JSON into the in-process LRU, evicting the oldest entry when full"""
+        with self._lock:
+            self._memory[key] = (created, raw_value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        expired = False
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, raw_value = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    # Entries are kept serialized, so every caller gets its own copy
+                    return json.loads(raw_value)
+                del self._memory[key]
+                expired = True
+
+        if self.path:
+            try:
+                conn = self._connection()
+                row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    raw_value, created = row
+                    with conn:
+                        if self._expired(created, now):
+                            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                            row = None
+                        else:
+                            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                    if row is not None:
+                        value = json.loads(raw_value)
+                        self._remember(key, created, raw_value)
+                        with self._lock:
+                            self._stats["disk_hits"] += 1
+                        return value
+                    expired = True
+            except sqlite3.Error as e:
+                logger.warning("USDA cache read error: %s", e)
+
+        with self._lock:
+            self._stats["misses"] += 1
+            if expired:
+                self._stats["expired"] += 1
+        return None
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under key"""
+        now = time.time()
+        raw_value = json.dumps(value)
+        self._remember(key, now, raw_value)
+
+        with self._lock:
+            self._stats["sets"] += 1
+            self._writes += 1
+            check_size = self._writes % _EVICTION_CHECK_INTERVAL == 0
+
+        if not self.path:
+            return
+
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, raw_value, now, now)
+                )
+            if check_size:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning("USDA cache write error: %s", e)
+
+    def _evict(self, conn):
+        """Drop expired rows, then the least recently used ones above max_entries"""
+        with conn:
+            removed = 0
+            if self.ttl > 0:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+            count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+        with self._lock:
+            self._stats["evictions"] += removed
+
+    def clear(self):
+        """Remove every entry from both levels"""
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Hit/miss counters plus derived hit rate and current sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Return the process-wide cache, or None when caching is disabled or the
+    disk store cannot be opened (lookups then run uncached)
+    """
+    global _cache, _cache_failed
+    if not CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = NutrientCache()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning("USDA cache unavailable at %s, running uncached: %s", CACHE_PATH, e)
+                    _cache_failed = True
+    return _cache
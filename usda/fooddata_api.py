@@ -1,10 +1,33 @@
+import asyncio
+import logging
+import os
 import requests
 import json
-from difflib import SequenceMatcher
+from nlp import fuzzy
+from .cache import get_cache, make_key, normalize_query
+from .http_client import get_client
+from .local_index import get_local_index, local_index_version
+from .nutrient_table import NutrientTable, as_dicts, as_floats, multiply
+from .resolution import log_query, resolution_table_version, resolve_ingredient
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
 
 # USDA FoodData Central API configuration
-USDA_API_KEY = "ecXV1I6dbQEUodkjrsfklpCMVLRHdT4E5f7wvELk"  # Get from https://fdc.nal.usda.gov/api-guide.html
-USDA_BASE_URL = "https://api.nal.usda.gov/fdc/v1"
+USDA_API_KEY = os.getenv("USDA_API_KEY", "ecXV1I6dbQEUodkjrsfklpCMVLRHdT4E5f7wvELk")  # Get from https://fdc.nal.usda.gov/api-guide.html
+USDA_BASE_URL = os.getenv("USDA_BASE_URL", "https://api.nal.usda.gov/fdc/v1")
+
+# Fall back to the live API when the offline index (usda/local_index.py) has no match
+USDA_API_FALLBACK = os.getenv("USDA_API_FALLBACK", "1").lower() not in ("0", "false", "no")
+
+# Searches are limited to the high-quality data types
+SEARCH_DATA_TYPES = ["Foundation", "SR Legacy"]
+
+# Maximum number of fdcIds accepted by one POST /foods call
+FOODS_BATCH_LIMIT = 20
+
+# Bump to invalidate responses cached from nutrient data (e.g. after clearing the USDA cache)
+NUTRIENT_DATA_VERSION = os.getenv("NUTRIENT_DATA_VERSION", "1")
 
 # Common unit conversions to grams
 UNIT_TO_GRAMS = {
@@ -37,27 +60,82 @@ UNIT_TO_GRAMS = {
     "glass": 240.0,  # standard glass
 }
 
-def search_food(query, limit=5):
-    """Search for foods in USDA database"""
-    if not USDA_API_KEY or USDA_API_KEY == "YOUR_API_KEY_HERE":
+# Collapse concurrent identical searches into one upstream call
+search_flight = SingleFlight()
+async_search_flight = AsyncSingleFlight()
+
+def _client():
+    """Shared pooled HTTP client for the configured API endpoint"""
+    return get_client(USDA_BASE_URL, USDA_API_KEY)
+
+def _has_api_key():
+    return bool(USDA_API_KEY) and USDA_API_KEY != "YOUR_API_KEY_HERE"
+
+def search_food(query, limit=5, allow_mock=True):
+    """
+    Search for foods in USDA database.
+    Without an API key the built-in mock data is searched instead (marked
+    "source": "mock"); when the API fails the mock result is also marked
+    "degraded". Callers that must not use mock data (offline builds) pass
+    allow_mock=False to get the requests.RequestException instead
+    """
+    # Offline index first: no network needed for indexed foods
+    local_index = get_local_index()
+    if local_index is not None:
+        local_results = local_index.search(query, limit=limit)
+        if local_results["foods"] or not USDA_API_FALLBACK:
+            return local_results
+    
+    if not _has_api_key():
+        if not allow_mock:
+            raise requests.RequestException("No USDA API key configured")
         # Return mock data for testing
         return mock_search_food(query)
     
-    url = f"{USDA_BASE_URL}/foods/search"
+    cache = get_cache()
+    cache_key = make_key("search", query, SEARCH_DATA_TYPES, pageSize=limit)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    def fetch():
+        result = search_food_api(query, limit)
+        if cache is not None:
+            cache.set(cache_key, result)
+        return result
+    
+    try:
+        # Identical searches already in flight share one upstream call
+        return search_flight.do(cache_key, fetch)
+    except requests.RequestException as e:
+        logger.warning("USDA API error: %s", e)
+        if not allow_mock:
+            raise
+        # Upstream down or circuit open: fall back to the built-in data
+        return dict(mock_search_food(query), degraded=True)
+
+async def search_food_async(query, limit=5):
+    """
+    search_food for asyncio callers. Concurrent identical queries share one
+    call; the key is search_food's, so they also join its thread-side calls
+    """
+    key = make_key("search", query, SEARCH_DATA_TYPES, pageSize=limit)
+    return await async_search_flight.do(key, asyncio.to_thread, search_food, query, limit)
+
+def search_food_api(query, limit=5):
+    """
+    One /foods/search call to the USDA API, without the local index, the
+    cache or the mock fallback; raises requests.RequestException
+    """
+    if not _has_api_key():
+        raise requests.RequestException("No USDA API key configured")
     params = {
         "query": query,
         "pageSize": limit,
-        "api_key": USDA_API_KEY,
-        "dataType": ["Foundation", "SR Legacy"]  # Focus on high-quality data
+        "dataType": SEARCH_DATA_TYPES
     }
-    
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"USDA API error: {e}")
-        return {"foods": []}
+    return _client().get("/foods/search", params=params)
 
 def mock_search_food(query):
     """Mock data for testing when API key is not available"""
@@ -115,35 +193,76 @@ def mock_search_food(query):
     }
     
     # Find best match
-    best_match = None
-    best_score = 0
+    food_names = list(mock_foods)
+    best_index, _ = fuzzy.best_match(query.lower(), [name.lower() for name in food_names], 0.3)
     
-    for food_name, food_data in mock_foods.items():
-        score = SequenceMatcher(None, query.lower(), food_name.lower()).ratio()
-        if score > best_score:
-            best_score = score
-            best_match = food_data
-    
-    if best_match and best_score > 0.3:
-        return {"foods": [best_match]}
+    if best_index is not None:
+        return {"foods": [mock_foods[food_names[best_index]]], "source": "mock"}
     else:
-        return {"foods": []}
+        return {"foods": [], "source": "mock"}
 
-def get_food_details(fdc_id):
-    """Get detailed nutrition information for a specific food"""
-    if not USDA_API_KEY or USDA_API_KEY == "YOUR_API_KEY_HERE":
+def _parse_fdc_id(value):
+    """value as a positive integer fdcId, or None when it is not one"""
+    try:
+        fdc_id = int(value)
+    except (TypeError, ValueError):
         return None
+    return fdc_id if fdc_id > 0 else None
+
+def get_foods_details(fdc_ids):
+    """
+    Get detailed nutrition information for many foods.
+    Ids not found locally or in the cache are fetched with POST /foods,
+    FOODS_BATCH_LIMIT ids per call. Returns a list aligned with fdc_ids
+    (None where no details are available or the id is not a valid fdcId)
+    """
+    parsed = [_parse_fdc_id(fdc_id) for fdc_id in fdc_ids]
+    found = {}
+    pending = []
     
-    url = f"{USDA_BASE_URL}/food/{fdc_id}"
-    params = {"api_key": USDA_API_KEY}
+    local_index = get_local_index()
+    cache = get_cache()
     
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"USDA API error: {e}")
-        return None
+    for fdc_id in dict.fromkeys(parsed):
+        if fdc_id is None:
+            continue
+        
+        if local_index is not None:
+            local_food = local_index.get(fdc_id)
+            if local_food is not None or not USDA_API_FALLBACK:
+                found[fdc_id] = local_food
+                continue
+        
+        if cache is not None:
+            cached = cache.get(make_key("food", fdc_id))
+            if cached is not None:
+                found[fdc_id] = cached
+                continue
+        
+        pending.append(fdc_id)
+    
+    if pending and _has_api_key():
+        for start in range(0, len(pending), FOODS_BATCH_LIMIT):
+            chunk = pending[start:start + FOODS_BATCH_LIMIT]
+            try:
+                foods = _client().post("/foods", json={"fdcIds": chunk})
+            except requests.RequestException as e:
+                logger.warning("USDA API error: %s", e)
+                continue
+            
+            by_id = {_parse_fdc_id(food.get("fdcId")): food for food in foods or []}
+            for fdc_id in chunk:
+                food = by_id.get(fdc_id)
+                if food is not None:
+                    found[fdc_id] = food
+                    if cache is not None:
+                        cache.set(make_key("food", fdc_id), food)
+    
+    return [found.get(fdc_id) for fdc_id in parsed]
+
+def get_food_details(fdc_id):
+    """Get detailed nutrition information for a specific food"""
+    return get_foods_details([fdc_id])[0]
 
 def _get_nutrient_value(nutrient_entry):
     """Extract numeric value from nutrient entry"""
@@ -221,45 +340,147 @@ def _normalize_macros_map(macros):
     }
     return normalized
 
-def get_nutrition_for_item(item):
+def nutrient_data_version():
     """
-    Get nutrition information for a food item
-    item: dict with keys 'ingredient', 'quantity', 'unit'
+    Identifies the nutrient data lookups are served from: changes when the
+    local index or resolution table changes, or the data source is switched
     """
-    ingredient = item.get("ingredient", "")
-    quantity = item.get("quantity", 1.0)
-    unit = item.get("unit", "serving")
+    source = USDA_BASE_URL if _has_api_key() else "mock"
+    return f"{NUTRIENT_DATA_VERSION}:{source}:{local_index_version()}:{resolution_table_version()}"
+
+def match_ingredient(ingredient):
+    """
+    (description, per-100 g macros, degraded) of the food an ingredient
+    resolves to; description and macros are None when nothing matched.
+    degraded is set when the API failed and mock data was used instead
+    """
+    # Known ingredients are resolved from the precomputed table without a search
+    resolved = resolve_ingredient(ingredient)
+    if resolved is not None:
+        return resolved.get("description"), dict(resolved["macros"]), False
     
-    if not ingredient:
-        return {"error": "No ingredient specified"}
+    log_query(ingredient)
     
     # Search for the food
     search_results = search_food(ingredient)
     foods = search_results.get("foods", [])
+    degraded = bool(search_results.get("degraded"))
     
     if not foods:
-        return {"error": f"No USDA match found for '{ingredient}'"}
+        return None, None, degraded
     
     # Take the best match (first result)
     best_match = foods[0]
     
     # Extract macros (nutrients are per 100g in USDA data)
-    macros_per_100g = extract_core_macros(best_match)
+    return best_match.get("description"), extract_core_macros(best_match), degraded
+
+def _match_score(ingredient, description):
+    """Similarity of the ingredient to the matched food's description (simplified)"""
+    return round(fuzzy.ratio(ingredient.lower(), (description or "").lower()), 3)
+
+def get_nutrition_for_item(item):
+    """
+    Get nutrition information for a food item
+    item: dict with keys 'ingredient', 'quantity', 'unit'
+    """
+    ingredient = item.get("ingredient", "")
+    quantity = item.get("quantity", 1.0)
+    unit = item.get("unit", "serving")
+    
+    if not ingredient:
+        return {"error": "No ingredient specified"}
+    
+    description, macros_per_100g, degraded = match_ingredient(ingredient)
+    if macros_per_100g is None:
+        result = {"error": f"No USDA match found for '{ingredient}'"}
+    else:
+        # Convert user's quantity to grams
+        total_grams = convert_to_grams(quantity, unit)
+        
+        # Scale macros to actual quantity
+        scaled_macros = scale_macros(macros_per_100g, total_grams, base=100.0)
+        
+        result = {
+            "candidate": description,
+            "grams": total_grams,
+            "macros": _normalize_macros_map(scaled_macros),
+            "score": _match_score(ingredient, description)
+        }
+    
+    if degraded:
+        result["degraded"] = True
+    return result
+
+def convert_to_grams_many(quantities, units):
+    """convert_to_grams for lists of quantities and units (an array when NumPy is installed)"""
+    multipliers = {}
+    factors = []
+    for unit in units:
+        factor = multipliers.get(unit)
+        if factor is None:
+            factor = multipliers[unit] = convert_to_grams(1.0, unit)
+        factors.append(factor)
+    return multiply(quantities, factors)
+
+def get_nutrition_for_items(items, matches=None):
+    """
+    get_nutrition_for_item for a list of items, with identical results.
+    Each distinct (normalized) ingredient is looked up once; gram conversion
+    and scaling run over the whole batch on a NutrientTable instead of item
+    by item. `matches` maps normalized ingredients to match_ingredient
+    results the caller has already looked up (e.g. concurrently)
+    """
+    results = [None] * len(items)
+    table = NutrientTable()
+    known = matches or {}
+    matches = {}
+    scores = {}
+    positions, rows, quantities, units = [], [], [], []
+    
+    for i, item in enumerate(items):
+        ingredient = item.get("ingredient", "")
+        if not ingredient:
+            results[i] = {"error": "No ingredient specified"}
+            continue
+        
+        key = normalize_query(ingredient)
+        if key not in matches:
+            description, macros_per_100g, degraded = known[key] if key in known else match_ingredient(key)
+            row = None if macros_per_100g is None else table.add(macros_per_100g)
+            matches[key] = (row, description, degraded)
+        
+        match = matches[key]
+        if match[0] is None:
+            results[i] = {"error": f"No USDA match found for '{ingredient}'"}
+            if match[2]:
+                results[i]["degraded"] = True
+            continue
+        
+        if ingredient not in scores:
+            scores[ingredient] = _match_score(ingredient, match[1])
+        
+        positions.append(i)
+        rows.append(match[0])
+        quantities.append(item.get("quantity", 1.0))
+        units.append(item.get("unit", "serving"))
     
-    # Convert user's quantity to grams
-    total_grams = convert_to_grams(quantity, unit)
+    if not positions:
+        return results
     
-    # Scale macros to actual quantity
-    scaled_macros = scale_macros(macros_per_100g, total_grams, base=100.0)
+    grams = convert_to_grams_many(quantities, units)
+    scaled = as_dicts(table.scale(rows, grams))
     
-    # Calculate match score (simplified)
-    ingredient_lower = ingredient.lower()
-    description_lower = best_match.get("description", "").lower()
-    score = SequenceMatcher(None, ingredient_lower, description_lower).ratio()
+    for i, total_grams, macros in zip(positions, as_floats(grams), scaled):
+        ingredient = items[i]["ingredient"]
+        _, description, degraded = matches[normalize_query(ingredient)]
+        results[i] = {
+            "candidate": description,
+            "grams": total_grams,
+            "macros": macros,
+            "score": scores[ingredient]
+        }
+        if degraded:
+            results[i]["degraded"] = True
     
-    return {
-        "candidate": best_match.get("description"),
-        "grams": total_grams,
-        "macros": _normalize_macros_map(scaled_macros),
-        "score": round(score, 3)
-    }
\ No newline at end of file
+    return results
@@ -0,0 +1,199 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# HTTP client configuration (override through environment variables)
+USDA_CONNECT_TIMEOUT = float(os.getenv("USDA_CONNECT_TIMEOUT", "3.05"))  # seconds
+USDA_READ_TIMEOUT = float(os.getenv("USDA_READ_TIMEOUT", "10"))  # seconds
+USDA_MAX_RETRIES = int(os.getenv("USDA_MAX_RETRIES", "3"))
+USDA_BACKOFF_BASE = float(os.getenv("USDA_BACKOFF_BASE", "0.25"))  # seconds
+USDA_BACKOFF_MAX = float(os.getenv("USDA_BACKOFF_MAX", "4"))  # seconds
+USDA_POOL_SIZE = int(os.getenv("USDA_POOL_SIZE", "32"))
+USDA_BREAKER_THRESHOLD = int(os.getenv("USDA_BREAKER_THRESHOLD", "5"))  # consecutive failed calls
+USDA_BREAKER_RESET = float(os.getenv("USDA_BREAKER_RESET", "30"))  # seconds before a trial call
+
+# Responses worth retrying: rate limited or transient upstream failures
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling the upstream while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects calls
+    for `reset_timeout` seconds; then lets one trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold=USDA_BREAKER_THRESHOLD, reset_timeout=USDA_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def acquire(self):
+        """
+        None when a call may not go to the upstream right now; otherwise
+        whether the call is the half-open trial, whose outcome must be
+        recorded (or the trial released) before another call is let through
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return None
+            self._trial_in_flight = True
+            return True
+
+    def allow(self):
+        """Whether a call may go to the upstream right now"""
+        return self.acquire() is not None
+
+    def release_trial(self):
+        """Give up a trial call that ended without an outcome, so a new one can be made"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+class USDAClient:
+    """
+    Shared FoodData Central client: pooled keep-alive connections, per-call
+    timeouts, bounded retries with jittered exponential backoff on 429/5xx
+    and connection errors, and a circuit breaker that fails fast while the
+    upstream is down.
+    """
+
+    def __init__(self, base_url, api_key=None, timeout=(USDA_CONNECT_TIMEOUT, USDA_READ_TIMEOUT),
+                 max_retries=USDA_MAX_RETRIES, backoff_base=USDA_BACKOFF_BASE,
+                 backoff_max=USDA_BACKOFF_MAX, pool_size=USDA_POOL_SIZE, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to wait before retry `attempt` (full jitter, honours Retry-After)"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, path, params=None, json=None, timeout=None):
+        """Send a request and return the decoded JSON body; raises requests.RequestException"""
+        trial = self.breaker.acquire()
+        if trial is None:
+            metrics.inc("usda_api_requests_total", method=method, outcome="circuit_open")
+            raise CircuitOpenError(f"USDA circuit breaker is open, skipping {method} {path}")
+
+        params = dict(params or {})
+        if self.api_key:
+            params.setdefault("api_key", self.api_key)
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        try:
+            return self._send(method, url, params, json, timeout)
+        except BaseException as e:
+            # RequestExceptions have recorded an outcome; anything else (a bug,
+            # KeyboardInterrupt, ...) must not leave the breaker waiting for
+            # a trial that will never report back
+            if trial and not isinstance(e, requests.RequestException):
+                self.breaker.release_trial()
+            raise
+
+    def _send(self, method, url, params, json, timeout):
+        """request() after the breaker check: the retry loop"""
+        attempt = 0
+        while True:
+            response = None
+            try:
+                with metrics.timed("usda_http"):
+                    response = self.session.request(
+                        method, url, params=params, json=json, timeout=timeout or self.timeout
+                    )
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    result = response.json()
+                    self.breaker.record_success()
+                    metrics.inc("usda_api_requests_total", method=method, outcome="ok")
+                    return result
+                error = requests.HTTPError(
+                    f"{response.status_code} error from USDA API for {url}", response=response
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.RequestException:
+                # Client errors (4xx other than 429) will not succeed on retry,
+                # and they mean the upstream is reachable
+                self.breaker.record_success()
+                metrics.inc("usda_api_requests_total", method=method, outcome="client_error")
+                raise
+
+            if attempt >= self.max_retries:
+                self.breaker.record_failure()
+                metrics.inc("usda_api_requests_total", method=method, outcome="error")
+                raise error
+            metrics.inc("usda_api_retries_total", method=method)
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def get(self, path, params=None, **kwargs):
+        return self.request("GET", path, params=params, **kwargs)
+
+    def post(self, path, json=None, params=None, **kwargs):
+        return self.request("POST", path, params=params, json=json, **kwargs)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(base_url, api_key=None):
+    """
+    Return the shared client for base_url/api_key.
+    Clients are per process so pooled sockets are never shared across a fork
+    """
+    key = (os.getpid(), base_url, api_key)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = USDAClient(base_url, api_key=api_key)
+                _clients[key] = client
+    return client
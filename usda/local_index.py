@@ -0,0 +1,265 @@
+"""
+Offline FoodData Central index.
+
+Builds a compact local index from the USDA bulk downloads (Foundation and
+SR Legacy, CSV or JSON) holding per-100 g macros keyed by fdcId plus a token
+index over the descriptions, so ingredient lookups need no network.
+
+Build it with:
+    python -m usda.local_index build <export dir or json> [...] -o data/fdc_index.json.gz
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Default path is in the project's data/ directory whatever the working directory
+LOCAL_INDEX_PATH = os.getenv(
+    "USDA_LOCAL_INDEX", str(Path(__file__).resolve().parent.parent / "data" / "fdc_index.json.gz")
+)
+# Fraction of the query tokens a description must contain to count as a local hit;
+# below it the lookup is a miss (and falls back to the API when enabled)
+LOCAL_MIN_COVERAGE = float(os.getenv("USDA_LOCAL_MIN_COVERAGE", "0.75"))
+INDEX_FORMAT_VERSION = 1
+
+# Data types we index (bulk CSV names and JSON names)
+CSV_DATA_TYPES = {"foundation_food", "sr_legacy_food"}
+JSON_FOOD_KEYS = ("FoundationFoods", "SRLegacyFoods")
+
+# FoodData Central nutrient ids for the core macros, in order of preference
+ENERGY_IDS = (1008, 2047, 2048)  # Energy (kcal), Atwater general, Atwater specific
+PROTEIN_IDS = (1003,)
+CARBS_IDS = (1005, 1050)  # by difference, by summation
+FAT_IDS = (1004,)
+
+MACRO_NUTRIENTS = (
+    ("calories", ENERGY_IDS, 1008, "Energy", "kcal"),
+    ("protein_g", PROTEIN_IDS, 1003, "Protein", "g"),
+    ("carbs_g", CARBS_IDS, 1005, "Carbohydrate, by difference", "g"),
+    ("fat_g", FAT_IDS, 1004, "Total lipid (fat)", "g"),
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens with a light plural stemming"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if len(token) > 3 and token.endswith("es") and token[-3] in "sxz":
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def _pick_macros(amounts):
+    """Choose calories/protein/carbs/fat from a {nutrient_id: amount} map"""
+    values = []
+    for _, ids, _, _, _ in MACRO_NUTRIENTS:
+        value = 0.0
+        for nutrient_id in ids:
+            if amounts.get(nutrient_id) is not None:
+                value = amounts[nutrient_id]
+                break
+        values.append(round(float(value), 3))
+    return values
+
+def _read_csv_export(export_dir):
+    """Yield (fdcId, description, macros) from a bulk CSV download directory"""
+    export_dir = Path(export_dir)
+    wanted_ids = {nid for _, ids, _, _, _ in MACRO_NUTRIENTS for nid in ids}
+
+    foods = {}
+    with open(export_dir / "food.csv", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("data_type") in CSV_DATA_TYPES:
+                foods[int(row["fdc_id"])] = row["description"]
+
+    amounts = defaultdict(dict)
+    with open(export_dir / "food_nutrient.csv", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                fdc_id = int(row["fdc_id"])
+                nutrient_id = int(row["nutrient_id"])
+            except (KeyError, ValueError):
+                continue
+            if fdc_id in foods and nutrient_id in wanted_ids and row.get("amount"):
+                try:
+                    amounts[fdc_id][nutrient_id] = float(row["amount"])
+                except ValueError:
+                    continue
+
+    for fdc_id, description in foods.items():
+        yield fdc_id, description, _pick_macros(amounts.get(fdc_id, {}))
+
+def _read_json_export(json_path):
+    """Yield (fdcId, description, macros) from a bulk JSON download"""
+    opener = gzip.open if str(json_path).endswith(".gz") else open
+    with opener(json_path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+
+    for key in JSON_FOOD_KEYS:
+        for food in data.get(key, []):
+            food_amounts = {}
+            for nutrient in food.get("foodNutrients", []):
+                info = nutrient.get("nutrient") or {}
+                nutrient_id = info.get("id", nutrient.get("nutrientId"))
+                amount = nutrient.get("amount", nutrient.get("value"))
+                if nutrient_id is not None and amount is not None:
+                    food_amounts[int(nutrient_id)] = float(amount)
+            yield int(food["fdcId"]), food.get("description", ""), _pick_macros(food_amounts)
+
+def build_index(sources, output_path=LOCAL_INDEX_PATH):
+    """
+    Ingest bulk exports (CSV directories or JSON files) and write the index.
+    Returns the number of foods indexed
+    """
+    rows = {}
+    for source in sources:
+        source = Path(source)
+        reader = _read_csv_export if source.is_dir() else _read_json_export
+        for fdc_id, description, macros in reader(source):
+            rows[fdc_id] = [fdc_id, description] + macros
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": INDEX_FORMAT_VERSION,
+        "columns": ["fdcId", "description"] + [name for name, _, _, _, _ in MACRO_NUTRIENTS],
+        "foods": sorted(rows.values()),
+    }
+    with gzip.open(output_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+
+    return len(rows)
+
+class LocalFoodIndex:
+    """In-memory view of a built index: macros by fdcId and a token -> rows posting list"""
+
+    def __init__(self, foods):
+        self.fdc_ids = []
+        self.descriptions = []
+        self.macros = []
+        self.row_by_id = {}
+        self.postings = defaultdict(list)
+        # Position of each token in the description, used to prefer foods named first
+        self.positions = []
+
+        for row, (fdc_id, description, *macros) in enumerate(foods):
+            self.fdc_ids.append(fdc_id)
+            self.descriptions.append(description)
+            self.macros.append(tuple(macros))
+            self.row_by_id[fdc_id] = row
+
+            first_seen = {}
+            for position, token in enumerate(tokenize(description)):
+                if token not in first_seen:
+                    first_seen[token] = position
+                    self.postings[token].append(row)
+            self.positions.append(first_seen)
+
+    @classmethod
+    def load(cls, path=LOCAL_INDEX_PATH):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported local index version: {payload.get('version')}")
+        return cls(payload["foods"])
+
+    def __len__(self):
+        return len(self.fdc_ids)
+
+    def _food(self, row):
+        """Return a row in the same shape as an API search result"""
+        return {
+            "fdcId": self.fdc_ids[row],
+            "description": self.descriptions[row],
+            "foodNutrients": [
+                {"nutrientId": nutrient_id, "nutrientName": name, "value": value, "unitName": unit}
+                for (_, _, nutrient_id, name, unit), value in zip(MACRO_NUTRIENTS, self.macros[row])
+            ],
+        }
+
+    def get(self, fdc_id):
+        """Food for an fdcId, or None if it is not indexed"""
+        row = self.row_by_id.get(int(fdc_id))
+        return None if row is None else self._food(row)
+
+    def search(self, query, limit=5, min_coverage=LOCAL_MIN_COVERAGE):
+        """
+        Rank foods by how many query tokens their description contains,
+        then by how early the first query token appears, then by brevity.
+        Foods containing less than min_coverage of the query tokens are not
+        hits, so "almond milk" does not match every "milk" row
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return {"foods": []}
+
+        matched = defaultdict(int)
+        for token in tokens:
+            for row in self.postings.get(token, ()):
+                matched[row] += 1
+        required = min_coverage * len(tokens)
+        matched = {row: count for row, count in matched.items() if count >= required}
+        if not matched:
+            return {"foods": []}
+
+        def rank(row):
+            positions = self.positions[row]
+            first = min((positions[t] for t in tokens if t in positions), default=len(positions))
+            return (-matched[row], first, len(self.descriptions[row]), row)
+
+        best_rows = sorted(matched, key=rank)[:limit]
+        return {"foods": [self._food(row) for row in best_rows]}
+
+_index = None
+_index_version = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+def get_local_index():
+    """Return the process-wide local index, or None when no index has been built"""
+    global _index, _index_version, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                if LOCAL_INDEX_PATH and Path(LOCAL_INDEX_PATH).exists():
+                    try:
+                        _index_version = os.stat(LOCAL_INDEX_PATH).st_mtime_ns
+                        _index = LocalFoodIndex.load(LOCAL_INDEX_PATH)
+                    except (OSError, ValueError) as e:
+                        logger.warning("Failed to load local USDA index: %s", e)
+                        _index_version = None
+                _index_loaded = True
+    return _index
+
+def local_index_version():
+    """mtime of the loaded index file, or None when no index is loaded"""
+    get_local_index()
+    return _index_version
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline FoodData Central index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Ingest Foundation / SR Legacy bulk exports")
+    build.add_argument("sources", nargs="+", help="CSV export directories or JSON export files")
+    build.add_argument("-o", "--output", default=LOCAL_INDEX_PATH, help="Index file to write")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        count = build_index(args.sources, args.output)
+        print(f"Indexed {count} foods into {args.output}")
+
+if __name__ == "__main__":
+    main()
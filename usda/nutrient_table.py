@@ -0,0 +1,147 @@
+"""
+Array-backed per-100 g macro table for batch scaling and totals.
+
+Each food is one row of MACRO_KEYS values in a flat array('d'), so a batch
+of items is a list of row indices and gram amounts rather than a dict per
+item. With NumPy installed, scaling and totals run as vectorized operations
+over a zero-copy view of the rows; without it the same arithmetic runs in
+Python. Both paths give exactly the values the per-item code gives:
+  - scaling is the same IEEE multiply, value * (grams / base)
+  - rounding matches round(x, 2) (see round2)
+  - totals are added in item order starting from 0.0, as the totals loop does
+"""
+
+import importlib.util
+from array import array
+
+from .resolution import MACRO_KEYS
+
+# NumPy is imported by the functions that use it, on first call: importing
+# it here would add its import time to every module that imports this one
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+WIDTH = len(MACRO_KEYS)
+
+# np.round(x, 2) is rint(x * 100) / 100, which agrees with round(x, 2) unless
+# x * 100 lands within float error of a .5 tie; values that close (relative
+# to their size) are rounded with round() itself
+_TIE_TOLERANCE = 1e-12
+
+def round2(values):
+    """Round a 2-D array (or list of rows) to 2 decimals, identically to round(x, 2)"""
+    if not HAVE_NUMPY:
+        return [[round(value, 2) for value in row] for row in values]
+
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 2)
+    scaled = values * 100.0
+    with np.errstate(invalid="ignore"):
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= _TIE_TOLERANCE * np.maximum(1.0, np.abs(scaled))
+    if near_tie.any():
+        index = np.nonzero(near_tie)
+        rounded[index] = [round(value, 2) for value in values[index].tolist()]
+    return rounded
+
+def multiply(a, b):
+    """Element-wise product of two equal-length vectors"""
+    if not HAVE_NUMPY:
+        return [x * y for x, y in zip(a, b)]
+
+    import numpy as np
+    return np.asarray(a, dtype=np.float64) * np.asarray(b, dtype=np.float64)
+
+def as_floats(values):
+    """A vector (array or list) as a list of Python floats"""
+    # ndarray (or array('d')) to floats without importing NumPy to check the type
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return list(values)
+
+def as_dicts(values):
+    """Rows of a table (array or list of rows) as {macro: value} dicts of Python floats"""
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    return [dict(zip(MACRO_KEYS, row)) for row in values]
+
+def group_totals(values, groups, n_groups):
+    """
+    Sum rows of values into n_groups totals (row i goes to groups[i]), rounded
+    to 2 decimals. Rows are added in order starting from 0.0, so the sums are
+    the ones a Python loop gives; any grouping works (per meal, per day, ...)
+    """
+    if not HAVE_NUMPY:
+        totals = [[0.0] * WIDTH for _ in range(n_groups)]
+        for row, group in zip(values, groups):
+            total = totals[group]
+            for i in range(WIDTH):
+                total[i] += row[i]
+        return round2(totals)
+
+    import numpy as np
+
+    totals = np.zeros((n_groups, WIDTH))
+    if len(groups):
+        # Unbuffered and in index order, unlike sum()'s pairwise summation
+        np.add.at(totals, np.asarray(groups, dtype=np.intp),
+                  np.asarray(values, dtype=np.float64).reshape(-1, WIDTH))
+    return round2(totals)
+
+class NutrientTable:
+    """
+    Per-100 g macros of foods, one row per food in MACRO_KEYS order.
+
+        table = NutrientTable()
+        row = table.add(macros, key=fdc_id)
+        scaled = table.scale([row, row], [150.0, 30.0])
+    """
+
+    def __init__(self):
+        self._data = array("d")
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._data) // WIDTH
+
+    def add(self, macros, key=None):
+        """
+        Row index for a macros dict (missing keys count as 0.0).
+        Foods added under the same key share one row
+        """
+        if key is not None and key in self._rows:
+            return self._rows[key]
+        row = len(self)
+        self._data.extend(float(macros.get(name, 0.0)) for name in MACRO_KEYS)
+        if key is not None:
+            self._rows[key] = row
+        return row
+
+    def row(self, index):
+        start = index * WIDTH
+        return dict(zip(MACRO_KEYS, self._data[start:start + WIDTH]))
+
+    def scale(self, rows, grams, base=100.0):
+        """
+        Macros of rows[i] scaled from base grams to grams[i] and rounded to 2
+        decimals, one output row per item; the values scale_macros gives
+        """
+        if not HAVE_NUMPY:
+            scaled = []
+            for row, amount in zip(rows, grams):
+                factor = amount / base
+                start = row * WIDTH
+                scaled.append([value * factor for value in self._data[start:start + WIDTH]])
+            return round2(scaled)
+
+        import numpy as np
+
+        if not len(rows):
+            return np.zeros((0, WIDTH))
+        factors = np.asarray(grams, dtype=np.float64) / base
+        # View of the rows (no copy); fancy indexing below copies what it needs
+        table = np.frombuffer(self._data, dtype=np.float64).reshape(-1, WIDTH)
+        scaled = table[np.asarray(rows, dtype=np.intp)] * factors[:, None]
+        # Release the view so the array can grow again
+        del table
+        return round2(scaled)
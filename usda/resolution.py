@@ -0,0 +1,268 @@
+"""
+Ingredient -> fdcId resolution table.
+
+Maps normalized ingredient names (and aliases: every name that resolved to
+the same food) to a chosen fdcId with its per-100 g macros, so known
+ingredients skip the food search entirely. The table is a JSON file that
+is reloaded when it changes on disk, so it can be refreshed without
+restarting workers.
+
+Ingredients that miss the table are appended to USDA_QUERY_LOG (when set);
+build or refresh the table from that log with:
+    python -m usda.resolution build --log data/usda_queries.log [-o data/food_resolution.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import requests
+
+from logging_config import queue_handler
+from .cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Default path is in the project's data/ directory whatever the working directory
+RESOLUTION_TABLE_PATH = os.getenv(
+    "USDA_RESOLUTION_TABLE", str(Path(__file__).resolve().parent.parent / "data" / "food_resolution.json")
+)
+RESOLUTION_RELOAD_INTERVAL = float(os.getenv("USDA_RESOLUTION_RELOAD_INTERVAL", "5"))  # seconds between mtime checks
+QUERY_LOG_PATH = os.getenv("USDA_QUERY_LOG", "")  # empty disables query logging
+TABLE_FORMAT_VERSION = 1
+
+MACRO_KEYS = ("calories", "protein_g", "carbs_g", "fat_g")
+
+class ResolutionTable:
+    """In-memory table: normalized name -> {"fdcId", "description", "macros"}"""
+
+    def __init__(self, foods):
+        self.foods = foods
+        self.by_name = {}
+        for food in foods:
+            for name in food["names"]:
+                self.by_name[normalize_query(name)] = food
+
+    @classmethod
+    def load(cls, path=RESOLUTION_TABLE_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != TABLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported resolution table version: {payload.get('version')}")
+        return cls(payload["foods"])
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def lookup(self, ingredient):
+        """Resolved food for an ingredient, or None if it is not in the table"""
+        return self.by_name.get(normalize_query(ingredient))
+
+def write_table(foods, path=RESOLUTION_TABLE_PATH):
+    """Write the table atomically so a reloading worker never reads a partial file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": TABLE_FORMAT_VERSION, "foods": foods}, f, indent=1)
+    os.replace(tmp_path, path)
+
+class _ReloadingTable:
+    """Holds the table loaded from `path` and reloads it when its mtime changes"""
+
+    def __init__(self, path, reload_interval):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._table = None
+        self._mtime = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+            return self._table
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+                return self._table
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                table = None
+                if mtime is not None:
+                    try:
+                        table = ResolutionTable.load(self.path)
+                    except (OSError, ValueError, KeyError) as e:
+                        # Keep serving the previous table until the file is fixed
+                        logger.warning("Failed to load resolution table: %s", e)
+                        table = self._table
+                self._table = table
+                self._mtime = mtime
+            self._checked_at = now
+            return self._table
+
+    def version(self):
+        """mtime of the file the current table was loaded from (None without a table)"""
+        self.get()
+        return self._mtime if self._table is not None else None
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def _table_holder():
+    holder = _tables.get(RESOLUTION_TABLE_PATH)
+    if holder is None:
+        with _tables_lock:
+            holder = _tables.setdefault(
+                RESOLUTION_TABLE_PATH, _ReloadingTable(RESOLUTION_TABLE_PATH, RESOLUTION_RELOAD_INTERVAL)
+            )
+    return holder
+
+def get_resolution_table():
+    """Return the current resolution table, or None when there is none"""
+    if not RESOLUTION_TABLE_PATH:
+        return None
+    return _table_holder().get()
+
+def resolution_table_version():
+    """Identifies the current table (changes on reload), or None when there is none"""
+    if not RESOLUTION_TABLE_PATH:
+        return None
+    return _table_holder().version()
+
+def resolve_ingredient(ingredient):
+    """Resolved food ({"fdcId", "description", "macros"}) for an ingredient, or None"""
+    table = get_resolution_table()
+    return None if table is None else table.lookup(ingredient)
+
+_query_logger = None
+_query_logger_lock = threading.Lock()
+
+def _get_query_logger():
+    """Logger writing one line per record to QUERY_LOG_PATH from a queue listener thread"""
+    global _query_logger
+    if _query_logger is None:
+        with _query_logger_lock:
+            if _query_logger is None:
+                output = logging.FileHandler(QUERY_LOG_PATH, encoding="utf-8", delay=True)
+                output.setFormatter(logging.Formatter("%(message)s"))
+                query_logger = logging.getLogger("usda.queries")
+                query_logger.setLevel(logging.INFO)
+                query_logger.propagate = False
+                query_logger.addHandler(queue_handler(output))
+                _query_logger = query_logger
+    return _query_logger
+
+def log_query(ingredient):
+    """
+    Append an unresolved ingredient to the query log (no-op unless
+    USDA_QUERY_LOG is set). The write happens on the logging queue's
+    thread, not in the caller
+    """
+    if not QUERY_LOG_PATH:
+        return
+    _get_query_logger().info(json.dumps({"query": normalize_query(ingredient)}))
+
+def read_query_log(path):
+    """Count the normalized queries in a query log"""
+    counts = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                query = json.loads(line)["query"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            counts[normalize_query(query)] += 1
+    return counts
+
+def build_table(names, output_path=RESOLUTION_TABLE_PATH, refresh=False):
+    """
+    Resolve names with a USDA API search (first result) and merge them into
+    the table. Existing names are kept unless refresh is set. Names whose
+    search fails are skipped, never resolved from mock data.
+    Returns (names, foods) in the table and the names that failed
+    """
+    from .fooddata_api import extract_core_macros, search_food_api
+
+    foods = {}
+    if Path(output_path).exists():
+        for food in ResolutionTable.load(output_path).foods:
+            foods[food["fdcId"]] = food
+    known = {normalize_query(name) for food in foods.values() for name in food["names"]}
+
+    failed = []
+    for name in dict.fromkeys(normalize_query(name) for name in names):
+        if not name or (name in known and not refresh):
+            continue
+        try:
+            results = search_food_api(name).get("foods", [])
+        except requests.RequestException as e:
+            logger.warning("Search for %r failed, skipping it: %s", name, e)
+            failed.append(name)
+            continue
+        if not results:
+            continue
+        best_match = results[0]
+        fdc_id = best_match.get("fdcId")
+        if fdc_id is None:
+            continue
+
+        # A name resolves to one food only: drop it from wherever it was before
+        for food in foods.values():
+            if name in food["names"]:
+                food["names"].remove(name)
+
+        macros = extract_core_macros(best_match)
+        food = foods.setdefault(fdc_id, {"fdcId": fdc_id, "names": []})
+        food["description"] = best_match.get("description")
+        food["macros"] = {key: macros[key] for key in MACRO_KEYS}
+        food["names"].append(name)
+
+    table = sorted((food for food in foods.values() if food["names"]), key=lambda food: food["fdcId"])
+    for food in table:
+        food["names"].sort()
+    write_table(table, output_path)
+    return sum(len(food["names"]) for food in table), len(table), failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the ingredient -> fdcId resolution table")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Resolve logged or listed ingredients and merge them into the table")
+    build.add_argument("--log", action="append", default=[], help="Query log written through USDA_QUERY_LOG")
+    build.add_argument("--names", action="append", default=[], help="Text file with one ingredient per line")
+    build.add_argument("--min-count", type=int, default=1, help="Only resolve logged queries seen this many times")
+    build.add_argument("--refresh", action="store_true", help="Re-resolve names already in the table")
+    build.add_argument("-o", "--output", default=RESOLUTION_TABLE_PATH, help="Table file to write")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        counts = Counter()
+        for log_path in args.log:
+            counts.update(read_query_log(log_path))
+        names = [name for name, count in counts.most_common() if count >= args.min_count]
+        for names_path in args.names:
+            with open(names_path, "r", encoding="utf-8") as f:
+                names.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+        name_count, food_count, failed = build_table(names, args.output, refresh=args.refresh)
+        print(f"Resolution table {args.output}: {name_count} names -> {food_count} foods")
+        if failed:
+            print(f"{len(failed)} names could not be searched and were skipped: {', '.join(failed)}",
+                  file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls (thread version).
+
+    While a call for `key` is in flight, other threads calling do() with the
+    same key wait for it and receive its result (or exception) instead of
+    making their own call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "executions": 0, "collapsed": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["collapsed"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent identical calls (asyncio version).
+
+    `coro_fn(*args, **kwargs)` is awaited once per key at a time; concurrent
+    callers with the same key await the same task.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._stats = {"calls": 0, "executions": 0, "collapsed": 0}
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        self._stats["calls"] += 1
+        task = self._tasks.get(key)
+        if task is not None:
+            self._stats["collapsed"] += 1
+        else:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._tasks[key] = task
+            self._stats["executions"] += 1
+            task.add_done_callback(lambda _, key=key: self._tasks.pop(key, None))
+        # shield() so one cancelled caller does not cancel the call for everyone
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return dict(self._stats)